@@ -0,0 +1,39 @@
+import argparse
+import logging
+import sys
+import time
+
+from billing.invoice import Invoice, InvoiceLine
+from billing.utils.paths import Config, DataDir
+from billing.utils.setup_logger import logger
+
+# ** Benchmark multi-line invoices: render time must scale linearly with the number of lines
+# Invoices are rendered in memory from dummy data, nothing is written to disk
+
+parser = argparse.ArgumentParser(description="Benchmark render time against invoice line count")
+parser.add_argument("-n", "--n-lines", type=int, nargs="+", default=[250, 1000, 4000], help="Line counts")
+parser.add_argument("--tolerance", type=float, default=2.0,
+                    help="Max ratio between per-line time of the largest and smallest invoice")
+args = parser.parse_args()
+
+logger.setLevel(logging.WARNING)
+config = Config(DataDir.DUMMY_DATA, DataDir.DUMMY_DATABASE, DataDir.INVOICE_DIR)
+
+per_line = {}
+print(f"{'lines':>8}{'pages':>8}{'total ms':>12}{'ms/line':>10}")
+for n_lines in sorted(args.n_lines):
+    lines = [InvoiceLine(f"Prestation jour {k + 1}", 1, 485) for k in range(n_lines)]
+    invoice = Invoice(period_month="Août", period_year="2025", lines=lines, TVA=True, config=config)
+
+    start = time.perf_counter()
+    pdf = invoice.render_pdf()
+    elapsed = time.perf_counter() - start
+
+    per_line[n_lines] = elapsed / n_lines
+    print(f"{n_lines:>8}{pdf.count(b'/Type /Page') - 1:>8}{1000 * elapsed:>12.1f}{1000 * per_line[n_lines]:>10.3f}")
+
+ratio = per_line[max(per_line)] / per_line[min(per_line)]
+print(f"per-line time ratio (largest / smallest): {ratio:.2f}")
+if ratio > args.tolerance:
+    print(f"Render time is not linear in line count (tolerance {args.tolerance})")
+    sys.exit(1)
@@ -0,0 +1,26 @@
+import argparse
+import logging
+import time
+
+from billing.invoice import Invoice
+from billing.invoice.profiles import PROFILES
+from billing.utils.paths import Config, DataDir
+from billing.utils.setup_logger import logger
+
+# ** Benchmark PDF output profiles: bytes per invoice and render time
+# Invoices are rendered in memory from dummy data, nothing is written to disk
+
+parser = argparse.ArgumentParser(description="Benchmark PDF output profiles")
+parser.add_argument("-n", "--n-invoices", type=int, default=50, help="Number of invoices rendered per profile")
+args = parser.parse_args()
+
+logger.setLevel(logging.WARNING)
+config = Config(DataDir.DUMMY_DATA, DataDir.DUMMY_DATABASE, DataDir.INVOICE_DIR)
+invoice = Invoice(period_month="Août", period_year="2025", quantity=20.5, unit_price=485, TVA=True, config=config)
+
+print(f"{'profile':<14}{'bytes/invoice':>15}{'ms/invoice':>12}")
+for name, profile in PROFILES.items():
+    start = time.perf_counter()
+    size = sum(len(invoice.render_pdf(profile)) for _ in range(args.n_invoices))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<14}{size / args.n_invoices:>15.0f}{1000 * elapsed / args.n_invoices:>12.2f}")
@@ -1,8 +1,11 @@
 import argparse
+import sys
 
 from billing.utils.setup_logger import logger
 from .utils.paths import DataDir
-from .utils.auto import manual_setup, manage_invoice, find_files_based_on_key
+from .invoice.profiles import PROFILES
+from .utils.auto import (manual_setup, manage_invoice, find_files_based_on_key, verify_database,
+                         backup_database, restore_database, migrate_database, migrate_database_amounts)
 
 
 def main():
@@ -15,6 +18,21 @@ def main():
     parser.add_argument("-d", "--data", type=str,
                         help="Path to folder containing data.json and database.json", default=None)
     parser.add_argument("-i", "--invoice", type=str, help="Path to invoice directory", default=None)
+    parser.add_argument("-p", "--profile", type=str, choices=list(PROFILES), default="default",
+                        help="PDF output profile")
+    # maintenance commands, run instead of invoice generation
+    command = parser.add_mutually_exclusive_group()
+    command.add_argument("--verify", action="store_true",
+                         help="Verify database integrity (invoices added since last verification) and exit")
+    command.add_argument("--backup", type=str, metavar="BACKUP_DIR", default=None,
+                         help="Backup database (invoices added since last backup) in BACKUP_DIR and exit")
+    command.add_argument("--restore", type=str, metavar="BACKUP_DIR", default=None,
+                         help="Restore database from BACKUP_DIR and exit")
+    command.add_argument("--migrate", type=str, metavar="PARTITIONS_DIR", default=None,
+                         help="Split JSON database into year partitions in PARTITIONS_DIR and exit")
+    command.add_argument("--migrate-amounts", action="store_true",
+                         help="Verify database and convert its float amounts to integer cents and exit")
+    parser.add_argument("--full", action="store_true", help="With --verify, re-hash the whole database")
 
     args = parser.parse_args()
 
@@ -38,7 +56,21 @@ def main():
 
     logger.info(f"Current set up\n{DataDir.status()}")
 
-    manage_invoice()
+    # exit status 1 on failure (e.g. tampered database), for scheduled jobs
+    if args.verify:
+        success = verify_database(full=args.full)
+    elif args.backup is not None:
+        success = backup_database(args.backup)
+    elif args.restore is not None:
+        success = restore_database(args.restore)
+    elif args.migrate is not None:
+        success = migrate_database(args.migrate)
+    elif args.migrate_amounts:
+        success = migrate_database_amounts()
+    else:
+        success = manage_invoice(profile=args.profile)
+
+    sys.exit(0 if success else 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+# backup.py
+
+import gzip
+import json
+import os
+from datetime import datetime
+from .exceptions import IntegrityError
+from .integrity import GENESIS_HASH, verify_chain, clear_checkpoint
+from .storage import open_storage, keep_copy
+from ..utils.setup_logger import logger
+
+__all__ = ["backup", "restore"]
+
+MANIFEST = "manifest.json"
+
+
+def _load_manifest(backup_dir):
+    """ Load backup manifest, None if no backup was made yet """
+    try:
+        with open(os.path.join(backup_dir, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_manifest(backup_dir, manifest):
+    """ Write manifest atomically, a failed backup leaves the previous manifest untouched """
+    tmp_file = os.path.join(backup_dir, f"{MANIFEST}.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_file, os.path.join(backup_dir, MANIFEST))
+
+
+def _write_segment(backup_dir, kind, records):
+    """ Write records in a compressed segment file, return its file name """
+    filename = f"{kind}_{datetime.now():%Y%m%dT%H%M%S%f}.json.gz"
+    with gzip.open(os.path.join(backup_dir, filename), "wt", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=True, separators=(",", ":"))
+    return filename
+
+
+def _read_segment(backup_dir, filename):
+    with gzip.open(os.path.join(backup_dir, filename), "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def backup(db, backup_dir):
+    """
+    Backup the invoice database in backup_dir.
+
+    The first backup writes a full compressed snapshot. Following backups only write a delta segment holding the
+    invoices added since the last backup. A new full snapshot is written if the database no longer extends the
+    backed up one (invoices removed or modified).
+
+    Args:
+        db (InvoiceDataBase): database to back up.
+        backup_dir (str): backup directory, created if missing.
+
+    Returns:
+        str: file name of the written segment, None if there was nothing new to back up.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    manifest = _load_manifest(backup_dir)
+
+    if manifest is not None:
+        count = manifest["count"]
+        if count > db.count or (count > 0 and next(db.records(count - 1)).get("hash") != manifest["hash"]):
+            logger.warning(f"Database {db.db_file!r} diverged from backup. Full backup required.")
+            manifest = None
+
+    if manifest is None:
+        manifest = {"segments": [], "count": 0, "hash": GENESIS_HASH}
+        kind = "full"
+    elif manifest["count"] == db.count:
+        logger.info(f"Backup {backup_dir!r} is up to date ({db.count} invoice(s)).")
+        return None
+    else:
+        kind = "delta"
+
+    # archived years are only read for a full backup
+    start = manifest["count"]
+    new_records = list(db.records(start))
+    filename = _write_segment(backup_dir, kind, new_records)
+
+    manifest["segments"].append({"file": filename, "kind": kind, "start": start, "count": len(new_records)})
+    manifest["count"] = db.count
+    manifest["hash"] = new_records[-1].get("hash") if new_records else manifest["hash"]
+    _save_manifest(backup_dir, manifest)
+
+    logger.info(f"Backup {kind} {filename!r}: {len(new_records)} invoice(s) saved, {db.count} in total.")
+    return filename
+
+
+def restore(backup_dir, db_file):
+    """
+    Restore a database from backup_dir by replaying the full snapshot and its delta segments.
+
+    Segments are checked for continuity and the hash chain of the restored invoices is verified before writing: a
+    broken chain, or a backup where only some invoices are hashed, raises IntegrityError.
+    db_file is a JSON file or a directory of year partitions. An existing db_file is first copied to a new
+    `<db_file>.<timestamp>.bak`, so that successive restores never lose the original database.
+
+    Returns:
+        int: number of restored invoices.
+    """
+    manifest = _load_manifest(backup_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No backup manifest found in {backup_dir!r}.")
+
+    records = []
+    for segment in manifest["segments"]:
+        if segment["start"] != len(records):
+            raise IntegrityError(f"Backup segment {segment['file']!r} does not follow previous segments.")
+        records.extend(_read_segment(backup_dir, segment["file"]))
+
+    if len(records) != manifest["count"]:
+        raise IntegrityError(f"Backup holds {len(records)} invoice(s), {manifest['count']} expected.")
+
+    # legacy (unsealed) databases are restored as is, a partially hashed one or a broken chain is refused
+    verify_chain(records)
+
+    if os.path.exists(db_file):
+        logger.warning(f"Existing database {db_file!r} kept as {keep_copy(db_file)!r}.")
+
+    open_storage(db_file).write_all(records)
+    clear_checkpoint(db_file)
+
+    logger.info(f"Database {db_file!r} restored from {backup_dir!r}: {len(records)} invoice(s).")
+    return len(records)
@@ -1,28 +1,53 @@
 # database.py
 
-import json
 import os
-from .exceptions import TVAError, InvoiceNumberError, InvalidInvoice
+from array import array
+from datetime import datetime
+from .exceptions import TVAError, InvoiceNumberError, InvalidInvoice, IntegrityError
+from .integrity import GENESIS_HASH, record_hash, chain_records, load_checkpoint, save_checkpoint, clear_checkpoint
+from .storage import open_storage, invoice_year
 from ..utils.setup_logger import logger
+from ..utils.money import Cents
 from ..utils.paths import DataDir
 
 __all__ = ["InvoiceDataBase"]
 
 class InvoiceDataBase:
 
-    THRESHOLD_TVA = 41_250
+    THRESHOLD_TVA = Cents(41_250_00)
 
-    def __init__(self):
+    def __init__(self, config=None):
 
-        if not os.path.isfile(DataDir.DATABASE):
-            logger.warning(f"Custom data {DataDir.DATABASE!r} not found. Defaulted to dummy data.")
+        # an explicit tenant configuration never falls back to the shared dummy database
+        explicit = config is not None or DataDir.in_context()
+        self.config = config if config is not None else DataDir.current()
+
+        if not os.path.exists(self.config.database):
+            if explicit:
+                raise FileNotFoundError(f"Database {self.config.database!r} not found.")
+            logger.warning(f"Custom data {self.config.database!r} not found. Defaulted to dummy data.")
             logger.info(f"Change data dir with <DataDir.update_database_path(database_path)> before running script.")
             self.db_file = DataDir.DUMMY_DATABASE
         else:
-            self.db_file = DataDir.DATABASE
+            self.db_file = self.config.database
 
+        # single JSON file, or year partitions where only the active year is loaded
+        self.storage = open_storage(self.db_file)
         self.db = self.load_data_base()
 
+        # float amounts are only converted by an explicit, verified migration (see storage.migrate_amounts)
+        if self.storage.float_amounts or any("total_HT_cents" not in invoice for invoice in self):
+            raise IntegrityError(f"Database {self.db_file!r} stores float amounts. "
+                                 f"Convert it to integer cents with --migrate-amounts first.")
+
+        # columns of loaded invoices (fiscal year, revenue HT in cents) and running revenue of the current fiscal
+        # year, kept up to date by add_invoice: aggregations never go back to the invoice dicts nor parse dates
+        self.fiscal_year = self.storage.active_year or datetime.now().year
+        self._years = array("H", (invoice_year(invoice) for invoice in self))
+        self._total_HT_cents = array("q", (invoice["total_HT_cents"] for invoice in self))
+        self._total_HT = Cents(sum(cents for year, cents in zip(self._years, self._total_HT_cents)
+                                   if year == self.fiscal_year))
+
     def __iter__(self):
         return (invoice_dict for invoice_dict in self.db)
 
@@ -43,7 +68,16 @@ class InvoiceDataBase:
             logger.error(f"Cannot add invalid invoice to database.")
             return
 
-        self.db.append(invoice.to_dict())
+        if len(self) > 0 and "hash" not in self.db[-1]:
+            self.seal()
+
+        record = invoice.to_dict()
+        record["hash"] = record_hash(self.last_hash, record)
+        self.db.append(record)
+        self._years.append(invoice_year(record))
+        self._total_HT_cents.append(record["total_HT_cents"])
+        if self._years[-1] == self.fiscal_year:
+            self._total_HT += record["total_HT_cents"]
         self._save_db(invoice)
 
     def _check_tva_threshold(self, invoice):
@@ -75,10 +109,9 @@ class InvoiceDataBase:
           - Must always increase.
           - If equal to last invoice, increment it automatically.
         """
-        if len(self) > 0:
+        if self.last_number is not None:
 
-            last_invoice = self.db[-1]
-            if last_invoice["number"] <= invoice.number:
+            if self.last_number <= invoice.number:
                 logger.warning(f"Last billing in database has same number: {invoice.number}. "
                                f"Current billing number is incremented (+1).")
                 invoice.number += 1
@@ -96,20 +129,121 @@ class InvoiceDataBase:
             logger.error(f"{err}")
             raise InvalidInvoice(err) from err
 
+    def seal(self):
+        """
+        Chain a legacy database (stored before integrity hashes were introduced).
+        Only allowed when no record is hashed yet, a partially hashed ledger is considered tampered.
+        """
+        if any("hash" in invoice for invoice in self):
+            raise IntegrityError(f"Database {self.db_file!r} is partially hashed. Cannot seal it.")
+
+        chain_records(self.db, self.storage.prev_hash)
+        clear_checkpoint(self.db_file)
+        self._write_db()
+        logger.warning(f"Legacy database {self.db_file!r} sealed: {len(self)} invoice(s) chained.")
+
+    def verify_integrity(self, full=False):
+        """
+        Verify the hash chain of the database.
+
+        Verification resumes from the last checkpoint: the last verified record is re-hashed and checked against the
+        stored hash, then only invoices added since are re-hashed. An in-place edit of an older verified invoice is
+        NOT detected in this mode, it is only caught by full=True, which re-hashes the whole ledger. Scheduled audits
+        must therefore run a full verification regularly.
+
+        Returns:
+            int: number of records hashed during this verification.
+        """
+        count, last_hash = (0, GENESIS_HASH) if full else load_checkpoint(self.db_file)
+
+        if count > self.count:
+            raise IntegrityError(f"Database holds {self.count} invoice(s) but {count} were already verified. "
+                                 f"Invoices were removed.")
+
+        # archived years are only loaded if the checkpoint is older than the active year
+        records = self.records(max(count - 2, 0))
+        if count > 0:
+            prev_hash = next(records).get("hash") if count > 1 else GENESIS_HASH
+            last_verified = next(records)
+            if last_verified.get("hash") != last_hash:
+                raise IntegrityError(f"Invoice n°{last_verified['number']} differs from last verified state.")
+            if record_hash(prev_hash, last_verified) != last_hash:
+                raise IntegrityError(f"Invoice n°{last_verified['number']} is corrupted: hash chain broken.")
+
+        for invoice in records:
+            expected = record_hash(last_hash, invoice)
+            if invoice.get("hash") != expected:
+                raise IntegrityError(f"Invoice n°{invoice['number']} is corrupted: hash chain broken.")
+            last_hash = expected
+
+        save_checkpoint(self.db_file, self.count, last_hash)
+        logger.info(f"Database integrity verified: {self.count - count} new invoice(s) hashed, "
+                    f"{self.count} in total.")
+        return self.count - count
+
+    def records(self, start=0):
+        """Iterate over all invoices (archived years, then active one) from global position start."""
+        offset = self.storage.offset
+        if start < offset:
+            yield from self.storage.archived(start)
+        yield from self.db[max(start - offset, 0):]
+
+    def history(self, year=None):
+        """Iterate over the invoices of a year, or of all years. Archived years are loaded on demand."""
+        if year is None:
+            return self.records()
+        if year == self.storage.active_year:
+            return iter(self.db)
+        return self.storage.year(year)
+
+    @property
+    def count(self):
+        """Number of invoices across all years."""
+        return self.storage.offset + len(self)
+
+    @property
+    def last_number(self):
+        """Number of the last stored invoice, None if the database is empty."""
+        return self.db[-1]["number"] if len(self) > 0 else self.storage.last_number
+
+    @property
+    def last_hash(self):
+        """Hash of the last invoice in db, used to chain the next one."""
+        return self.db[-1]["hash"] if len(self) > 0 else self.storage.prev_hash
+
     @property
     def total_HT(self):
-        """Compute the total db revenue before tax (HT) across all invoices."""
-        return sum(invoice["total_HT"] for invoice in self)
+        """Revenue before tax (HT) of the current fiscal year, checked against the TVA threshold."""
+        return self._total_HT
+
+    def revenue_by_year(self):
+        """
+        Revenue before tax (HT) per fiscal year. Frozen years are read from their summary, archives are not loaded,
+        loaded invoices are rolled up from the year and revenue columns.
+
+        Returns:
+            dict[int, Cents]: revenue HT by year.
+        """
+        revenue = self.storage.frozen_revenue()
+        if self.storage.active_year is not None:
+            revenue[self.storage.active_year] = self.total_HT
+        else:
+            totals = {}
+            for year, cents in zip(self._years, self._total_HT_cents):
+                totals[year] = totals.get(year, 0) + cents
+            revenue.update((year, Cents(total)) for year, total in totals.items())
+        return revenue
 
     def load_data_base(self):
-        """Load database from JSON file."""
-        with open(self.db_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data
+        """Load database from JSON file (active year partition if partitioned)."""
+        return self.storage.load()
+
+    def _write_db(self):
+        """ Write database to JSON file (active year partition if partitioned) """
+        self.storage.save(self.db)
 
     def _save_db(self, invoice):
         """ Add invoice to database """
-        with open(self.db_file, "w") as f:
-            json.dump(self.db, f, ensure_ascii=True, indent=4)
+        self._write_db()
         logger.info(f"Invoice n°{invoice.number} ADDED to database")
 
@@ -7,4 +7,7 @@ class InvoiceNumberError(BaseException):
     pass
 
 class TVAError(BaseException):
+    pass
+
+class IntegrityError(BaseException):
     pass
\ No newline at end of file
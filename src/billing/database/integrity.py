@@ -0,0 +1,86 @@
+# integrity.py
+
+import hashlib
+import json
+import os
+from .exceptions import IntegrityError
+
+__all__ = ["GENESIS_HASH", "record_hash", "chain_records", "verify_chain", "load_checkpoint", "save_checkpoint",
+           "clear_checkpoint"]
+
+GENESIS_HASH = "0" * 64
+
+
+def record_hash(prev_hash, record):
+    """
+    Compute the chained hash of a database record.
+
+    The record is serialized canonically (sorted keys, no whitespace, its own "hash" field excluded) and hashed
+    together with the hash of the previous record, so that altering any invoice breaks every following link.
+    """
+    payload = {key: value for key, value in record.items() if key != "hash"}
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=True, separators=(",", ":"))
+    return hashlib.sha256(f"{prev_hash}{canonical}".encode("utf-8")).hexdigest()
+
+
+def chain_records(records, prev_hash=GENESIS_HASH):
+    """ (re)compute the hash of each record in place, starting from prev_hash. Return the last hash """
+    for record in records:
+        prev_hash = record["hash"] = record_hash(prev_hash, record)
+    return prev_hash
+
+
+def verify_chain(records, prev_hash=GENESIS_HASH):
+    """
+    Verify the hash chain of records, starting from prev_hash.
+
+    A legacy ledger, where no record is hashed yet, is accepted as is. A partially hashed ledger or a broken link
+    raises IntegrityError.
+
+    Returns:
+        bool: True if the records are hashed, False for a legacy ledger.
+    """
+    hashed = sum("hash" in record for record in records)
+    if hashed == 0:
+        return False
+    if hashed < len(records):
+        raise IntegrityError(f"Ledger is partially hashed: {len(records) - hashed} invoice(s) without hash.")
+
+    for record in records:
+        prev_hash = record_hash(prev_hash, record)
+        if record["hash"] != prev_hash:
+            raise IntegrityError(f"Invoice n°{record['number']} is corrupted: hash chain broken.")
+    return True
+
+
+def checkpoint_path(db_file):
+    """ checkpoint file stored next to the database """
+    return f"{db_file}.checkpoint"
+
+
+def load_checkpoint(db_file):
+    """
+    Load the last verified position of the ledger.
+
+    Returns:
+        tuple[int, str]: number of verified records and hash of the last verified record.
+                         (0, GENESIS_HASH) if the ledger was never verified.
+    """
+    try:
+        with open(checkpoint_path(db_file), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return int(data["count"]), data["hash"]
+    except (FileNotFoundError, KeyError, ValueError):
+        return 0, GENESIS_HASH
+
+
+def save_checkpoint(db_file, count, last_hash):
+    """ Store the last verified position of the ledger """
+    with open(checkpoint_path(db_file), "w", encoding="utf-8") as f:
+        json.dump({"count": count, "hash": last_hash}, f, indent=4)
+
+
+def clear_checkpoint(db_file):
+    """ Remove checkpoint, next verification re-hashes the full ledger """
+    if os.path.isfile(checkpoint_path(db_file)):
+        os.remove(checkpoint_path(db_file))
@@ -0,0 +1,381 @@
+# storage.py
+
+import gzip
+import json
+import os
+import shutil
+import stat
+from datetime import datetime
+from itertools import islice
+from .integrity import GENESIS_HASH, chain_records, verify_chain, clear_checkpoint
+from ..utils.setup_logger import logger
+from ..utils.money import Cents, to_cents
+
+__all__ = ["JsonFileStorage", "PartitionedStorage", "open_storage", "is_partitioned", "keep_copy",
+           "migrate_to_partitions", "migrate_amounts", "invoice_year", "amounts_to_cents"]
+
+MANIFEST = "manifest.json"
+
+
+def invoice_year(record):
+    """ Fiscal year of a stored invoice, from its emission date (dd/mm/YYYY) """
+    return int(record["invoice_date"][-4:])
+
+
+def amounts_to_cents(record):
+    """
+    Convert float amounts (euros) of a stored invoice to integer cents in place. Return True if converted.
+    Raise ValueError if the invoice holds neither float nor integer cents amounts.
+    """
+    if "total_HT_cents" in record:
+        return False
+    if "total_HT" not in record or any("unit_price" not in line for line in record.get("lines", [])):
+        raise ValueError(f"Invoice n°{record.get('number')} has no amount to convert.")
+
+    unit_price = record.pop("unit_price", None)
+    record["unit_price_cents"] = None if unit_price is None else int(to_cents(unit_price))
+    record["total_HT_cents"] = int(to_cents(record.pop("total_HT")))
+    for line in record.get("lines", []):
+        line["unit_price_cents"] = int(to_cents(line.pop("unit_price")))
+    return True
+
+
+def _read_manifest(directory):
+    """ Manifest of directory, None if missing """
+    try:
+        with open(os.path.join(directory, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _is_partition_manifest(manifest):
+    """ Backup directories also hold a manifest.json, only partition manifests list active and frozen years """
+    return isinstance(manifest, dict) and "active" in manifest and "frozen" in manifest
+
+
+def is_partitioned(path):
+    """ True if path is a directory holding a partitioned database """
+    try:
+        return os.path.isdir(path) and _is_partition_manifest(_read_manifest(path))
+    except ValueError:
+        return False
+
+
+def _write_json(path, records):
+    """ Write records atomically, an interrupted write leaves the previous file untouched """
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(records, f, ensure_ascii=True, indent=4)
+    os.replace(tmp_file, path)
+
+
+def _make_writable(path):
+    """ Read-only archives must be made writable before being replaced or removed (Windows) """
+    if os.path.isfile(path):
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+
+
+class JsonFileStorage:
+    """ Single JSON file holding every invoice (legacy layout) """
+
+    offset = 0
+    prev_hash = GENESIS_HASH
+    last_number = None
+    active_year = None
+    float_amounts = False
+
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        cls_name = type(self).__name__
+        return f"{cls_name}(path={self.path!r})"
+
+    def load(self):
+        """ Load every invoice """
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, records):
+        _write_json(self.path, records)
+
+    def archived(self, start=0):
+        """ No archive in a single file """
+        return iter(())
+
+    def frozen_revenue(self):
+        return {}
+
+    def year(self, year):
+        return (record for record in self.load() if invoice_year(record) == year)
+
+    def write_all(self, records):
+        """ Replace the whole content of the database """
+        self.save(records)
+
+
+class PartitionedStorage:
+    """
+    Database split in one partition per fiscal year, in a directory:
+        manifest.json    → partitions list, with a summary (count, revenue, last number and hash) of frozen years
+        <year>.json      → active year, loaded and rewritten by daily operations
+        <year>.json.gz   → closed years, compressed and read-only, only loaded by historical queries
+
+    Opening the storage in a new year freezes the previous active partition. Files are replaced atomically and the
+    manifest is written last, so an interrupted freeze or rewrite is either not visible or completed on next open.
+    """
+
+    def __init__(self, path, year=None):
+        self.path = path
+        self.active_year = year if year is not None else datetime.now().year
+        self.manifest = self._load_manifest()
+
+        if self.manifest["active"] is None:
+            self._set_active(self.active_year)
+        elif self.manifest["active"] < self.active_year:
+            self.freeze(self.manifest["active"])
+        elif self.manifest["active"] > self.active_year:
+            raise ValueError(f"Database {path!r} active year {self.manifest['active']} is in the future.")
+
+        # partition files of frozen years left by an interrupted freeze
+        for partition in self.manifest["frozen"]:
+            if os.path.isfile(self._active_file(partition["year"])):
+                os.remove(self._active_file(partition["year"]))
+
+    def __repr__(self):
+        cls_name = type(self).__name__
+        return f"{cls_name}(path={self.path!r}, active_year={self.active_year})"
+
+    # ** manifest
+    def _load_manifest(self):
+        manifest = _read_manifest(self.path)
+        if manifest is None:
+            return {"active": None, "frozen": []}
+        if not _is_partition_manifest(manifest):
+            raise ValueError(f"Directory {self.path!r} is not a partitioned database (e.g. a backup directory).")
+        return manifest
+
+    def _save_manifest(self):
+        """ Write manifest atomically """
+        tmp_file = os.path.join(self.path, f"{MANIFEST}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=4)
+        os.replace(tmp_file, os.path.join(self.path, MANIFEST))
+
+    def _set_active(self, year):
+        os.makedirs(self.path, exist_ok=True)
+        self.manifest["active"] = year
+        if not os.path.isfile(self._active_file(year)):
+            _write_json(self._active_file(year), [])
+        self._save_manifest()
+
+    # ** partition files
+    def _active_file(self, year):
+        return os.path.join(self.path, f"{year}.json")
+
+    def _archive_file(self, year):
+        return os.path.join(self.path, f"{year}.json.gz")
+
+    def _write_archive(self, year, records):
+        """ Write a compressed read-only archive to a temporary file (see _commit_archive), return its summary """
+        tmp_file = f"{self._archive_file(year)}.tmp"
+        with gzip.open(tmp_file, "wt", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=True, separators=(",", ":"))
+        os.chmod(tmp_file, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+
+        summary = {
+            "year": year,
+            "count": len(records),
+            "last_number": records[-1]["number"] if records else None,
+            "last_hash": records[-1].get("hash") if records else None,
+        }
+        # years stored with float amounts have no revenue summary until converted (see migrate_amounts)
+        if all("total_HT_cents" in record for record in records):
+            summary["total_HT_cents"] = sum(record["total_HT_cents"] for record in records)
+        return summary
+
+    def _commit_archive(self, year):
+        """ Atomically replace the archive of year by its temporary file """
+        archive = self._archive_file(year)
+        _make_writable(archive)
+        os.replace(f"{archive}.tmp", archive)
+
+    def _read_archive(self, year):
+        with gzip.open(self._archive_file(year), "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    # ** summary of frozen years, read from manifest only
+    @property
+    def offset(self):
+        """ Number of invoices stored in frozen years """
+        return sum(partition["count"] for partition in self.manifest["frozen"])
+
+    @property
+    def prev_hash(self):
+        """ Hash of the last frozen invoice, the active year chain starts from it """
+        for partition in reversed(self.manifest["frozen"]):
+            if partition["last_hash"] is not None:
+                return partition["last_hash"]
+        return GENESIS_HASH
+
+    @property
+    def float_amounts(self):
+        """ True if frozen years were stored with float amounts, before integer cents """
+        return any("total_HT_cents" not in partition for partition in self.manifest["frozen"])
+
+    def frozen_revenue(self):
+        """ Revenue HT in cents of each frozen year """
+        return {partition["year"]: Cents(partition["total_HT_cents"]) for partition in self.manifest["frozen"]}
+
+    @property
+    def last_number(self):
+        for partition in reversed(self.manifest["frozen"]):
+            if partition["last_number"] is not None:
+                return partition["last_number"]
+        return None
+
+    # ** active year
+    def load(self):
+        """ Load the invoices of the active year """
+        with open(self._active_file(self.active_year), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, records):
+        """ Write the invoices of the active year """
+        _write_json(self._active_file(self.active_year), records)
+
+    def freeze(self, year):
+        """
+        Close a year: compress its partition into a read-only archive and open the active year.
+
+        The year is listed as frozen and the active year moved in a single manifest write, after the archive is
+        written and before the partition file is removed: an interrupted freeze is replayed on next open.
+        """
+        if not any(partition["year"] == year for partition in self.manifest["frozen"]):
+            with open(self._active_file(year), "r", encoding="utf-8") as f:
+                records = json.load(f)
+            self.manifest["frozen"].append(self._write_archive(year, records))
+            self._commit_archive(year)
+            logger.info(f"Year {year} frozen: {len(records)} invoice(s) archived in {self._archive_file(year)!r}.")
+
+        self._set_active(self.active_year)
+        if os.path.isfile(self._active_file(year)):
+            os.remove(self._active_file(year))
+
+    # ** historical queries
+    def archived(self, start=0):
+        """ Iterate over frozen invoices from global position start, only loading the archives needed """
+        offset = 0
+        for partition in self.manifest["frozen"]:
+            if offset + partition["count"] > start:
+                yield from islice(self._read_archive(partition["year"]), max(start - offset, 0), None)
+            offset += partition["count"]
+
+    def year(self, year):
+        """ Iterate over the invoices of a year """
+        if year == self.active_year:
+            return iter(self.load())
+        if any(partition["year"] == year for partition in self.manifest["frozen"]):
+            return iter(self._read_archive(year))
+        return iter(())
+
+    def write_all(self, records):
+        """ Replace the whole content of the database, invoices are split by year """
+        by_year = {}
+        for record in records:
+            by_year.setdefault(invoice_year(record), []).append(record)
+        if by_year and max(by_year) > self.active_year:
+            raise ValueError(f"Invoices dated after active year {self.active_year} cannot be stored.")
+
+        # new archives are all written before replacing any, those of years no longer stored are removed once the
+        # manifest is written
+        frozen = [self._write_archive(year, by_year[year]) for year in sorted(by_year) if year < self.active_year]
+        for partition in frozen:
+            self._commit_archive(partition["year"])
+        stale = {partition["year"] for partition in self.manifest["frozen"]}
+        stale -= {partition["year"] for partition in frozen}
+        self.save(by_year.get(self.active_year, []))
+        self.manifest["frozen"] = frozen
+        self._save_manifest()
+
+        for year in stale:
+            _make_writable(self._archive_file(year))
+            os.remove(self._archive_file(year))
+
+
+def open_storage(path):
+    """ Storage of a database path: a JSON file (legacy layout) or a directory of year partitions """
+    if os.path.isdir(path):
+        return PartitionedStorage(path)
+    return JsonFileStorage(path)
+
+
+def keep_copy(path):
+    """
+    Copy a database (JSON file or directory of year partitions) to `<path>.<timestamp>.bak`. Previous copies are
+    never overwritten.
+
+    Returns:
+        str: path of the copy.
+    """
+    copy = f"{path}.{datetime.now():%Y%m%dT%H%M%S%f}.bak"
+    if os.path.isdir(path):
+        shutil.copytree(path, copy)
+    else:
+        with open(path, "rb") as src, open(copy, "xb") as dst:
+            shutil.copyfileobj(src, dst)
+    return copy
+
+
+def migrate_to_partitions(db_file, directory):
+    """
+    Split a single JSON database into year partitions in directory. Past years are frozen.
+    The hash chain of the JSON database is verified first, a tampered database raises IntegrityError. A legacy
+    database (without hashes or with float amounts) is then converted and chained. The JSON file is left untouched.
+
+    Returns:
+        PartitionedStorage: the new storage.
+    """
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        raise FileExistsError(f"Directory {directory!r} already holds a partitioned database.")
+
+    records = JsonFileStorage(db_file).load()
+    hashed = verify_chain(records)
+    converted = sum(amounts_to_cents(record) for record in records)
+    if converted or not hashed:
+        chain_records(records)
+
+    storage = PartitionedStorage(directory)
+    storage.write_all(records)
+    logger.info(f"Database {db_file!r} migrated to {directory!r}: {len(records)} invoice(s), "
+                f"{len(storage.manifest['frozen'])} frozen year(s).")
+    return storage
+
+
+def migrate_amounts(db_file):
+    """
+    Convert a database stored with float amounts (euros) to integer cents, across all years.
+
+    The existing hash chain is verified first, a tampered database raises IntegrityError instead of being re-chained.
+    Converted invoices change, so the hash chain of the whole ledger is then rebuilt and the checkpoint reset. The
+    database is copied to `<db_file>.<timestamp>.bak` before being rewritten.
+
+    Returns:
+        int: number of converted invoices.
+    """
+    storage = open_storage(db_file)
+    records = list(storage.archived()) + storage.load()
+    verify_chain(records)
+
+    converted = sum(amounts_to_cents(record) for record in records)
+    if not converted:
+        logger.info(f"Database {db_file!r} already stores integer cents.")
+        return 0
+
+    chain_records(records)
+    logger.warning(f"Database {db_file!r} kept as {keep_copy(db_file)!r}.")
+    storage.write_all(records)
+    clear_checkpoint(db_file)
+    logger.warning(f"Database {db_file!r}: {converted} invoice(s) converted to integer cents, hash chain rebuilt.")
+    return converted
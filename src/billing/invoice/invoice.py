@@ -1,37 +1,66 @@
 # invoice.py
 
+import io
 import os
 import json
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate
 from .utils import *
-from .template import BuildPDFMixin, footer
+from .template import BuildPDFMixin, load_plan
+from .profiles import get_profile
 from ..utils.paths import DataDir
+from ..utils.money import Cents, percent_of
 from ..utils.setup_logger import logger
 from datetime import datetime
 
 
-__all__ = ["Invoice"]
+__all__ = ["Invoice", "InvoiceLine"]
 
 class Invoice(BuildPDFMixin):
 
-    def __init__(self, period_month, period_year, quantity, unit_price=485, TVA=False):
+    TVA_RATE = 20   # percent
+    DESCRIPTION = "Prestation de service en informatique"
+
+    def __init__(self, period_month, period_year, quantity=None, unit_price=485, TVA=False, config=None, lines=None):
+        """
+        Invoice of a work period. Either a single service line (quantity days at unit_price) or a list of
+        InvoiceLine (expenses, several missions, per-day breakdown...).
+        Prices are given in euros, amounts are stored and computed exactly in integer cents (Cents).
+        """
 
         self.period_month = period_month
         self.period_year = period_year
         self.TVA = TVA
-        self.unit_price = unit_price
-        self.quantity = quantity
         self.is_valid = None
 
-        if not os.path.isfile(DataDir.DATA):
-            logger.warning(f"Custom data {DataDir.DATA!r} not found. Defaulted to dummy data.")
+        if lines is None:
+            if quantity is None:
+                raise ValueError("Invoice requires either a quantity or a list of lines.")
+            lines = [InvoiceLine(self.DESCRIPTION, quantity, unit_price)]
+        self.lines = list(lines)
+        if not self.lines:
+            raise ValueError("Invoice requires at least one line.")
+        # an explicit tenant configuration never falls back to the dummy company data
+        explicit = config is not None or DataDir.in_context()
+        self.config = config if config is not None else DataDir.current()
+
+        if not os.path.isfile(self.config.data):
+            if explicit:
+                raise FileNotFoundError(f"Data file {self.config.data!r} not found.")
+            logger.warning(f"Custom data {self.config.data!r} not found. Defaulted to dummy data.")
             logger.info(f"Change data dir with <DataDir.update_data_path(data_path)> before running script.")
             self.setup_file = DataDir.DUMMY_DATA
         else:
-            self.setup_file = DataDir.DATA
+            self.setup_file = self.config.data
+
+        # totals in one pass over lines, unit_price is only defined if shared by all lines
+        self.quantity, self.total_HT, unit_prices = 0, Cents(0), set()
+        for line in self.lines:
+            self.quantity += line.quantity
+            self.total_HT += line.total_HT
+            unit_prices.add(line.unit_price)
+        self.unit_price = unit_prices.pop() if len(unit_prices) == 1 else None
 
-        self.total_HT = self.quantity * self.unit_price
         now = datetime.now()
         self.invoice_date = now.strftime("%d/%m/%Y")
         self.number = int(f"{now.year}{now.month:02}01")
@@ -58,6 +87,28 @@ class Invoice(BuildPDFMixin):
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in '{self.setup_file}': {e}")
 
+        # layout of the invoice: shipped template name or JSON path relative to the setup file.
+        # Only the template reference is kept so that invoices stay picklable (process pools), the plan is
+        # compiled (and cached) here to report an invalid template early
+        self.template = data.get("template", "default")
+        self.template_dir = os.path.dirname(self.setup_file)
+        load_plan(self.template, base_dir=self.template_dir)
+
+    @property
+    def plan(self):
+        """RenderPlan of the invoice layout, compiled once per process."""
+        return load_plan(self.template, base_dir=self.template_dir)
+
+    @property
+    def total_TVA(self):
+        """TVA amount, 0 if TVA is not applicable."""
+        return percent_of(self.total_HT, self.TVA_RATE) if self.TVA else Cents(0)
+
+    @property
+    def total_TTC(self):
+        """Total including TVA."""
+        return self.total_HT + self.total_TVA
+
 
     def to_dict(self):
         """ transform args into dict """
@@ -66,12 +117,15 @@ class Invoice(BuildPDFMixin):
             "period_month",
             "period_year",
             "quantity",
-            "unit_price",
-            "total_HT",
             "TVA",
             "invoice_date"
         )
-        return {arg:getattr(self, arg) for arg in args}
+        invoice_dict = {arg:getattr(self, arg) for arg in args}
+        # amounts stored as integer cents
+        invoice_dict["unit_price_cents"] = None if self.unit_price is None else int(self.unit_price)
+        invoice_dict["total_HT_cents"] = int(self.total_HT)
+        invoice_dict["lines"] = [line.to_dict() for line in self.lines]
+        return invoice_dict
 
     def __repr__(self):
         cls_name = type(self).__name__
@@ -82,6 +136,7 @@ class Invoice(BuildPDFMixin):
             f"period_year={self.period_year!r}, "
             f"quantity={self.quantity}, "
             f"unit_price={self.unit_price}, "
+            f"lines={len(self.lines)}, "
             f"apply_TVA={self.TVA})"
         )
 
@@ -89,20 +144,27 @@ class Invoice(BuildPDFMixin):
         return (f"<Invoice: n°{self.number} - {self.period_month} {self.period_year} - "
                 f"days={self.quantity} - unit_price={self.unit_price} - revenue_HT={self.total_HT} - TVA={self.TVA}>")
 
-    def build_pdf(self):
+    def render_pdf(self, profile="default"):
+        """ Render PDF invoice in memory with the given output profile. Return PDF bytes """
+        profile = get_profile(profile)
+        profile.check_fonts(self.plan.font_names)
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, **profile.doc_kwargs())
+
+        self._build_elements()
+        footer = self._footer()
+        doc.build(self._elements, onFirstPage=footer, onLaterPages=footer)
+        return buffer.getvalue()
+
+    def build_pdf(self, config=None, profile="default"):
+        """ Build PDF invoice in the invoice directory of config (defaults to the invoice configuration) """
+        config = config if config is not None else self.config
         pdf_invoice = f"facture_{self.number}_{self.company.name[:3]}.pdf"
-        doc = SimpleDocTemplate(filename=os.path.join(DataDir.INVOICE_DIR, pdf_invoice), pagesize=A4)
-
-        self._header()
-        self._company_details()
-        self._client_details()
-        self._period()
-        self._invoice_details()
-        self._invoice_data()
-        self._billing()
 
         if not self.is_valid:
             logger.warning(f"{self} is not valid")
 
-        doc.build(self._elements ,onFirstPage=footer(self.company, self.TVA))
+        pdf = self.render_pdf(profile)
+        with open(os.path.join(config.invoice_dir, pdf_invoice), "wb") as f:
+            f.write(pdf)
         logger.info(f"✅  PDF billing generated : {pdf_invoice}")
\ No newline at end of file
@@ -0,0 +1,54 @@
+# profiles.py
+
+from dataclasses import dataclass
+from reportlab.pdfbase.pdfmetrics import standardFonts
+
+__all__ = ["PDFProfile", "PROFILES", "get_profile"]
+
+
+@dataclass(frozen=True)
+class PDFProfile:
+    """
+    PDF output options.
+
+    Attributes:
+        name (str): profile name.
+        page_compression (int): compress page content streams (1) or not (0).
+        invariant (int): reproducible output (no timestamp nor random id), identical invoices give identical files.
+        standard_fonts (bool): refuse templates using fonts outside the 14 PDF standard fonts, which are never embedded.
+    """
+    name: str
+    page_compression: int = 1
+    invariant: int = 0
+    standard_fonts: bool = False
+
+    def doc_kwargs(self):
+        """ keyword arguments of reportlab DocTemplate """
+        return {"pageCompression": self.page_compression, "invariant": self.invariant}
+
+    def check_fonts(self, font_names):
+        """ Raise ValueError if standard fonts are enforced and a non-standard font is declared (see RenderPlan) """
+        if not self.standard_fonts:
+            return
+        embedded = sorted(set(font_names) - set(standardFonts))
+        if embedded:
+            raise ValueError(f"Profile {self.name!r} only allows standard PDF fonts, found {embedded}.")
+
+
+PROFILES = {
+    profile.name: profile for profile in (
+        PDFProfile("default"),
+        PDFProfile("uncompressed", page_compression=0),
+        PDFProfile("reproducible", page_compression=1, invariant=1, standard_fonts=True),
+    )
+}
+
+
+def get_profile(profile):
+    """ Return a PDFProfile from its name (or the profile itself) """
+    if isinstance(profile, PDFProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown PDF profile {profile!r}. Choose from {list(PROFILES)}.")
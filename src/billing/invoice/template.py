@@ -1,154 +1,297 @@
 # template.py
 
+import copy
+import json
+import os
+from collections.abc import Mapping
+from functools import lru_cache
+from string import Formatter
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.pdfgen import canvas
-from reportlab.lib.enums import TA_RIGHT
-from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
+from reportlab.platypus import LongTable, TableStyle, Paragraph, Spacer
 from reportlab.lib import colors
+from reportlab.rl_config import canvas_basefontname
+
+__all__ = ["TEMPLATE_DIR", "RenderPlan", "compile_template", "load_plan", "BuildPDFMixin"]
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+ALIGNMENTS = {"left": TA_LEFT, "center": TA_CENTER, "right": TA_RIGHT, "justify": TA_JUSTIFY}
+
+# TableStyle commands whose string arguments are not colors
+NON_COLOR_COMMANDS = {"FONTNAME", "FONT", "ALIGN", "ALIGNMENT", "VALIGN"}
+
+
+class _Fields(Mapping):
+    """ Read-only mapping over the attributes of an invoice, used to fill template fields """
+
+    def __init__(self, obj):
+        self._obj = obj
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self._obj, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __iter__(self):
+        return iter(vars(self._obj))
+
+    def __len__(self):
+        return len(vars(self._obj))
+
+
+def _has_fields(text):
+    """ True if text holds at least one {field} to be filled at render time """
+    return any(field is not None for _, field, _, _ in Formatter().parse(text))
+
+
+def _compile_cell(text):
+    """
+    Return formatter(fields) of a table cell. Cells made of a single "{attr}" or "{attr:spec}" field skip
+    str.format parsing, as they are rendered once per invoice line.
+    """
+    parsed = list(Formatter().parse(text))
+    if len(parsed) == 1:
+        literal, field, spec, conversion = parsed[0]
+        if field is None:
+            return lambda fields: literal
+        if not literal and conversion is None and field.isidentifier():
+            return lambda fields: format(fields[field], spec)
+    return lambda fields: text.format_map(fields)
+
+
+def _condition(item):
+    """ Return predicate(fields) from the optional "if"/"unless" keys of a template item """
+    if "if" in item:
+        return lambda fields: bool(fields[item["if"]])
+    if "unless" in item:
+        return lambda fields: not fields[item["unless"]]
+    return None
+
+
+class RenderPlan:
+    """
+    Invoice layout compiled from a declarative template.
+
+    Styles, static paragraphs and table styles are built once at compile time. Rendering an invoice only fills the
+    bound fields, through a flat list of steps (callables returning flowables). font_names holds the fonts declared
+    by the template, so that output profiles can check them before rendering.
+    """
+
+    def __init__(self, name, steps, footer, font_names=frozenset()):
+        self.name = name
+        self._steps = steps
+        self._footer = footer
+        self.font_names = frozenset(font_names)
+
+    def __repr__(self):
+        cls_name = type(self).__name__
+        return f"{cls_name}(name={self.name!r}, steps={len(self._steps)})"
+
+    def flowables(self, invoice):
+        """ Return the list of flowables of an invoice """
+        fields = _Fields(invoice)
+        elements = []
+        for step in self._steps:
+            elements.extend(step(fields))
+        return elements
+
+    def footer(self, invoice):
+        """ Return the onPage callback drawing the footer of an invoice """
+        fields = _Fields(invoice)
+        font, size, x, y, separator, items = self._footer
+        footer_text = separator.join(text.format_map(fields) for text, cond in items if cond is None or cond(fields))
+
+        def inner(canv: canvas.Canvas, doc):
+            canv.saveState()
+            canv.setFont(font, size)
+            canv.drawString(x, y, footer_text)
+            canv.restoreState()
+
+        return inner
+
+
+def _compile_styles(template):
+    """ Build ParagraphStyle objects declared in template """
+    sample = getSampleStyleSheet()
+    styles = {}
+    for name, options in template.get("styles", {}).items():
+        options = dict(options)
+        parent = sample[options.pop("parent", "Normal")]
+        if "alignment" in options:
+            options["alignment"] = ALIGNMENTS[options["alignment"]]
+        styles[name] = ParagraphStyle(name=name, parent=parent, **options)
+    styles.setdefault("normal", sample["Normal"])
+    return styles
+
+
+def _compile_table_style(commands):
+    """ Build TableStyle from JSON commands, color names are converted once """
+    compiled = []
+    for cmd, start, stop, *args in commands:
+        if cmd not in NON_COLOR_COMMANDS:
+            args = [colors.toColor(arg) if isinstance(arg, str) else arg for arg in args]
+        compiled.append((cmd, tuple(start), tuple(stop), *args))
+    return TableStyle(compiled)
+
+
+def _compile_paragraph(item, styles):
+    style = styles[item.get("style", "normal")]
+    text = item["text"]
+
+    if not _has_fields(text):
+        paragraph = Paragraph(text, style)
+        return lambda fields: [copy.copy(paragraph)]
+
+    return lambda fields: [Paragraph(text.format_map(fields), style)]
+
+
+def _compile_spacer(item, styles):
+    width, height = item.get("width", 1), item["height"]
+    return lambda fields: [Spacer(width, height)]
+
+
+def _compile_table(item, styles):
+    """
+    Table of static rows ("rows", bound to the invoice) and/or one row per invoice line ("line_row", bound to
+    each line). Rendered as a LongTable, the header is repeated on each page unless "repeat_header" is false.
+    A fixed "row_height" spares ReportLab from measuring every remaining row at each page split, which keeps
+    render time linear in the number of lines.
+    """
+    header = list(item.get("header", []))
+    rows = [[_compile_cell(cell) for cell in row] for row in item.get("rows", [])]
+    line_row = [_compile_cell(cell) for cell in item.get("line_row", [])]
+    col_widths = item.get("col_widths")
+    align = item.get("align", "CENTER")
+    repeat_rows = 1 if header and item.get("repeat_header", True) else 0
+    row_height = item.get("row_height")
+    table_style = _compile_table_style(item.get("style", []))
+
+    def step(fields):
+        data = [header] if header else []
+        data.extend([cell(fields) for cell in row] for row in rows)
+        if line_row:
+            data.extend([cell(line_fields) for cell in line_row] for line_fields in map(_Fields, fields["lines"]))
+        row_heights = None if row_height is None else [row_height] * len(data)
+        table = LongTable(data, colWidths=col_widths, rowHeights=row_heights, hAlign=align, repeatRows=repeat_rows)
+        table.setStyle(table_style)
+        return [table]
+
+    return step
+
+
+def _font_names(template, styles, footer_font):
+    """ Fonts declared by a template: paragraph styles, table FONTNAME/FONT commands (or default font), footer """
+    font_names = {style.fontName for style in styles.values()}
+    font_names.add(footer_font)
+    for section in template["sections"]:
+        for item in section["items"]:
+            if item["type"] == "table":
+                font_names.add(canvas_basefontname)
+                font_names.update(args[0] for cmd, start, stop, *args in item.get("style", [])
+                                  if cmd in ("FONTNAME", "FONT"))
+    return font_names
+
+
+COMPILERS = {
+    "paragraph": _compile_paragraph,
+    "spacer": _compile_spacer,
+    "table": _compile_table,
+}
+
+
+def compile_template(template, name="template"):
+    """
+    Compile a declarative template (dict loaded from JSON) into a RenderPlan.
+
+    Template keys:
+        styles: {name: ParagraphStyle options}, "parent" names a sample style, "alignment" is left/center/right
+        sections: [{"name": ..., "items": [...]}], items are paragraph, spacer or table, optionally
+                  conditioned by "if"/"unless" on an invoice attribute. Text is bound to invoice attributes with
+                  str.format fields, e.g. "{company.name}" or "{total_HT:.2f}", table "line_row" cells are bound
+                  to each invoice line, e.g. "{description}"
+        footer: {"font", "size", "x", "y", "separator", "items": [{"text": ..., "if"/"unless": ...}]}
+    """
+    try:
+        styles = _compile_styles(template)
+        steps = []
+        for section in template["sections"]:
+            for item in section["items"]:
+                step = COMPILERS[item["type"]](item, styles)
+                cond = _condition(item)
+                if cond is not None:
+                    step = (lambda step, cond: lambda fields: step(fields) if cond(fields) else [])(step, cond)
+                steps.append(step)
+
+        footer = template.get("footer", {})
+        footer = (
+            footer.get("font", "Helvetica"),
+            footer.get("size", 9),
+            footer.get("x", 72),
+            footer.get("y", 20),
+            footer.get("separator", "  -  "),
+            [(item["text"], _condition(item)) for item in footer.get("items", [])],
+        )
+        font_names = _font_names(template, styles, footer[0])
+    except KeyError as e:
+        raise ValueError(f"Invalid template {name!r}: unknown or missing key {e}")
+
+    return RenderPlan(name, steps, footer, font_names)
+
+
+@lru_cache(maxsize=None)
+def _load_plan(path):
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            template = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in template '{path}': {e}")
+    return compile_template(template, name=path)
+
+
+def load_plan(template="default", base_dir=None):
+    """
+    Return the RenderPlan of a template, compiled once per process.
+
+    Args:
+        template (str): name of a template shipped in TEMPLATE_DIR, or path to a JSON template file.
+        base_dir (str): directory of relative template paths (e.g. directory of data.json).
+    """
+    if template.endswith(".json"):
+        path = template if base_dir is None else os.path.join(base_dir, template)
+    else:
+        path = os.path.join(TEMPLATE_DIR, f"{template}.json")
+
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Template '{path}' not found.")
+    return _load_plan(os.path.abspath(path))
 
-class CustomStyle:
-    """ custom styles """
-    styles = getSampleStyleSheet()
-    normal = styles["Normal"]
-    heading = styles["Heading2"]
-
-    left_title = ParagraphStyle(
-        name = "left_tile",
-        parent=styles['Normal'],
-        fontSize=14,
-        fontName='Helvetica-Bold',
-        leading=18,
-        rightIndent=0
-    )
-
-    right_title = ParagraphStyle(
-        name = "right_tile",
-        parent=styles['Normal'],
-        fontSize=14,
-        fontName='Helvetica-Bold',
-        alignment=TA_RIGHT,
-        leading=18,
-        rightIndent=0
-    )
-
-    right = ParagraphStyle(name="right", parent=styles['Normal'], alignment=TA_RIGHT, rightIndent=0)
-
-    @classmethod
-    def get_style(cls, **kwargs):
-        """ return a custom style"""
-        return ParagraphStyle(name="gen", parent=cls.styles['Normal'], **kwargs)
-
-
-def footer(company, TVA):
-    """ Closure function to return pdf footer """
-
-    def inner(canvas: canvas.Canvas, doc):
-        canvas.saveState()
-        text = [
-            f"Siège social {company.street}, {company.postcode}, {company.city}, {company.country}",
-            f"N°SIREN: {company.siren}"
-        ]
-
-        if TVA:
-            text.append(f"N° TVA: {company.tva_number}")
-        footer_text = "  -  ".join(txt for txt in text)
-        canvas.setFont('Helvetica', 9)
-        canvas.drawString(72, 20, footer_text)  # 30pt from left, 20pt from bottom
-        canvas.restoreState()
-
-    return inner
 
 class BuildPDFMixin:
 
     """
-    Mixin to generate an billing PDF using ReportLab.
+    Mixin to generate an billing PDF using ReportLab from a compiled RenderPlan.
 
     Expects the consuming class to define:
+        self.plan → RenderPlan of the invoice layout
         self._elements (list) → list of Flowable objects
-        self.company → object with name, street, postcode, city, country, email, phone
-        self.client → object with name, street, postcode, city, country, siret
+        and the attributes bound in the template, for the default template:
+        self.company → object with name, street, postcode, city, country, email, phone, siren, tva_number
+        self.client → object with name, street, postcode, city, country, siret, tva_number
         self.bank → object with iban, bic
         self.number (str)
         self.invoice_date (str)
         self.period_month (str), self.period_year (int)
-        self.quantity (float/int)
-        self.unit_price (float)
-        self.total_HT (float)
+        self.lines → list of objects with description, quantity, unit_price, total_HT
+        self.total_HT, self.total_TVA, self.total_TTC (Cents)
         self.TVA (bool)
     """
 
-    def _header(self):
-        self._elements.append(Paragraph("<b>FACTURE</b>", CustomStyle.get_style(fontSize=25, leading=25)))
-        self._elements.append(Spacer(1, 20))
-
-    def _company_details(self):
-        self._elements.append(Paragraph(self.company.name, CustomStyle.left_title))
-        self._elements.append(Paragraph(f"{self.company.street}", ))
-        self._elements.append(Paragraph(f"{self.company.postcode}, {self.company.city}, {self.company.country}",
-                                        CustomStyle.normal))
-        self._elements.append(Paragraph(self.company.email, CustomStyle.normal))
-        self._elements.append(Paragraph(self.company.phone, CustomStyle.normal))
-        self._elements.append(Spacer(1, 4))
-
-    def _client_details(self):
-        self._elements.append(Paragraph(self.client.name, CustomStyle.right_title))
-        self._elements.append(Paragraph(f"{self.client.street}", CustomStyle.right))
-        self._elements.append(Paragraph(f"{self.client.postcode}, {self.client.city}, {self.client.country}",
-                                        CustomStyle.right))
-        self._elements.append(Paragraph(f"N°SIRET: {self.client.siret}", CustomStyle.right))
-        self._elements.append(Paragraph(f"N°TVA: {self.client.tva_number}", CustomStyle.right))
-        self._elements.append(Spacer(1, 60))
-
-    def _invoice_details(self):
-        self._elements.append(Paragraph(f"<b>Facture n°{self.number}</b>",
-                                        CustomStyle.get_style(fontSize=12,leading=16)))
-        self._elements.append(Paragraph(f"Date d’émission : {self.invoice_date}", CustomStyle.normal))
-        self._elements.append(Paragraph(f"Date limite de paiement : 30 jours à compter de l'émission de la "
-                                        f"présente facture",
-                                        CustomStyle.normal))
-        self._elements.append(Spacer(1, 24))
-
-    def _period(self):
-        self._elements.append(Paragraph(f"Période de réalisation de la prestation: "
-                                        f"{self.period_month} {self.period_year}", CustomStyle.heading))
-        self._elements.append(Spacer(1, 6))
-
-    def _invoice_data(self):
-
-        table_data = [
-            ["Description", "Quantité", "Prix unitaire HT (€)", "Total HT (€)"],
-            ["Prestation de service en informatique", self.quantity, self.unit_price, f"{self.total_HT:.2f}"]
-        ]
-
-        # Table Style
-        table = Table(table_data, colWidths=[180, 60, 100, 100], hAlign='CENTER')
-        table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-            ("GRID", (0, 0), (-1, -1), 1, colors.black),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("FONTSIZE", (0, 0), (-1, -1), 10),
-        ]))
-        self._elements.append(table)
-        self._elements.append(Spacer(1, 20))
-        self._elements.append(Paragraph(f"<b>Sous Total HT (euros):</b> {self.total_HT:.2f}",CustomStyle.right))
-        sub_tot = self.quantity*self.unit_price
-
-        if self.TVA:
-            tot = sub_tot*1.20
-            self._elements.append(Paragraph(f"<b>TVA (20%) (euros):</b> {0.20*sub_tot:.2f}", CustomStyle.right))
-        else:
-            tot = sub_tot
-            self._elements.append(Paragraph("<i>TVA non applicable, art. 293 B du CG </i>", CustomStyle.right))
-
-        self._elements.append(Paragraph(
-            f"<b>Total TTC (euros) : {tot:.2f}</b>",
-            CustomStyle.get_style(fontSize=12,alignment=TA_RIGHT, spaceBefore=8)))
-
-    # Billing details
-    def _billing(self):
-        self._elements.append(Spacer(1, 100))
-        self._elements.append(Paragraph("<b>Informations de paiements</b>",  CustomStyle.normal))
-        self._elements.append(Paragraph(f"<b>IBAN :</b> {self.bank.iban}",  CustomStyle.normal))
-        self._elements.append(Paragraph(f"<b>BIC :</b> {self.bank.bic}",  CustomStyle.normal))
+    def _build_elements(self):
+        self._elements = self.plan.flowables(self)
+
+    def _footer(self):
+        return self.plan.footer(self)
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from ..utils.money import Cents, to_cents, multiply
 
 @dataclass()
 class Company:
@@ -16,4 +17,20 @@ class Company:
 @dataclass()
 class Bank:
     iban: str
-    bic : str
\ No newline at end of file
+    bic : str
+
+@dataclass()
+class InvoiceLine:
+    description: str
+    quantity : float
+    unit_price : Cents   # given in euros, stored in cents
+
+    def __post_init__(self):
+        self.unit_price = to_cents(self.unit_price)
+
+    @property
+    def total_HT(self):
+        return multiply(self.quantity, self.unit_price)
+
+    def to_dict(self):
+        return {"description": self.description, "quantity": self.quantity, "unit_price_cents": int(self.unit_price)}
@@ -4,10 +4,12 @@ from babel.dates import format_date
 from billing.database import *
 from ..invoice import *
 from ..database.exceptions import *
+from ..database.backup import backup, restore
+from ..database.storage import migrate_to_partitions, migrate_amounts, is_partitioned
 from .paths import DataDir
 import os
 
-def manage_invoice():
+def manage_invoice(profile="default"):
     """
     Connect to the invoice database and generate a valid invoice.
 
@@ -22,25 +24,141 @@ def manage_invoice():
     Exceptions handled:
         TVAError: Raised when there is an issue with tax calculation or validation.
         InvalidInvoice: Raised when the invoice data structure is malformed.
+        IntegrityError: Raised when the database is tampered with or must be migrated, no invoice is stored.
+
+    Args:
+        profile (str): PDF output profile, see `billing.invoice.profiles.PROFILES`.
 
     Returns:
-        None
+        bool: True if the invoice was stored and built, False if the database integrity prevents it.
     """
-    db = InvoiceDataBase()
-    logger.info(f"DataBase {db}")
+    try:
+        db = InvoiceDataBase()
+        logger.info(f"DataBase {db}")
 
-    while True:
-        invoice = generate_invoice()
+        while True:
+            invoice = generate_invoice()
+
+            try:
+                db.check_invoice(invoice)
+                db.add_invoice(invoice)
+                invoice.build_pdf(profile=profile)
+                logger.info("Success")
+                return True
+
+            except (TVAError, InvalidInvoice) as err:
+                logger.error(f"Must redefine invoice")
+
+    except IntegrityError as err:
+        logger.error(f"Database integrity error, invoice not stored: {err}")
+        return False
+
+
+def verify_database(full=False):
+    """
+    Verify the hash chain of the invoice database.
+
+    Only invoices added since the last successful verification (and the last verified one) are re-hashed, unless
+    `full` is set. Edits of older verified invoices are only detected by a full verification.
 
-        try:
-            db.check_invoice(invoice)
-            db.add_invoice(invoice)
-            invoice.build_pdf()
-            logger.info("Success")
-            exit()
+    Args:
+        full (bool): re-hash the whole database instead of resuming from the last checkpoint.
 
-        except (TVAError, InvalidInvoice) as err:
-            logger.error(f"Must redefine invoice")
+    Returns:
+        bool: True if the database is intact, False otherwise.
+    """
+    try:
+        db = InvoiceDataBase()
+        logger.info(f"DataBase {db}")
+        db.verify_integrity(full=full)
+        return True
+    except IntegrityError as err:
+        logger.error(f"Database integrity check failed: {err}")
+        return False
+
+
+def backup_database(backup_dir):
+    """
+    Backup the invoice database in backup_dir.
+
+    The first backup is a full compressed snapshot, following ones only hold invoices added since the last backup.
+
+    Args:
+        backup_dir (str): backup directory, created if missing.
+
+    Returns:
+        bool: True if the backup is up to date, False otherwise.
+    """
+    try:
+        db = InvoiceDataBase()
+        logger.info(f"DataBase {db}")
+        backup(db, backup_dir)
+        return True
+    except (OSError, IntegrityError) as err:
+        logger.error(f"Database backup failed: {err}")
+        return False
+
+
+def restore_database(backup_dir):
+    """
+    Restore the invoice database from backup_dir. The current database is kept as `<database>.<timestamp>.bak`.
+
+    Args:
+        backup_dir (str): backup directory.
+
+    Returns:
+        bool: True if the database was restored, False otherwise.
+    """
+    try:
+        restore(backup_dir, DataDir.current().database)
+        return True
+    except (OSError, ValueError, IntegrityError) as err:
+        logger.error(f"Database restore failed: {err}")
+        return False
+
+
+def migrate_database(directory):
+    """
+    Split the current JSON database into year partitions stored in directory.
+
+    Past years are frozen into compressed read-only archives, only the current year is loaded by daily operations.
+    The JSON database is left untouched, point the database path to directory to use the partitions.
+
+    Args:
+        directory (str): directory of the partitioned database, created if missing.
+
+    Returns:
+        bool: True if the database was migrated, False otherwise.
+    """
+    database = DataDir.current().database
+    if not os.path.isfile(database):
+        logger.error(f"{database!r} is not a JSON database.")
+        return False
+
+    try:
+        migrate_to_partitions(database, directory)
+        return True
+    except (FileExistsError, ValueError, IntegrityError) as err:
+        logger.error(f"Database migration failed: {err}")
+        return False
+
+
+def migrate_database_amounts():
+    """
+    Convert the current database, stored with float amounts (euros), to integer cents.
+
+    The hash chain is verified before conversion: a tampered database is left untouched. The database is copied to
+    `<database>.<timestamp>.bak`, then the chain is rebuilt over the converted invoices.
+
+    Returns:
+        bool: True if the database stores integer cents, False otherwise.
+    """
+    try:
+        migrate_amounts(DataDir.current().database)
+        return True
+    except (OSError, ValueError, IntegrityError) as err:
+        logger.error(f"Database amounts migration failed: {err}")
+        return False
 
 
 def manual_setup():
@@ -118,6 +236,9 @@ def find_files_based_on_key(_dir):
     """
     Search for JSON files in a given directory whose filenames contain
     the keywords 'data' or 'database', and return the first match for each.
+    A directory of year partitions (holding a partition manifest.json, not a backup one) whose name contains
+    'database' is also accepted for 'database', and takes precedence over a JSON database (e.g. the JSON file left
+    untouched by --migrate).
 
     Args:
         _dir (str): Path to the directory to search.
@@ -126,20 +247,30 @@ def find_files_based_on_key(_dir):
         dict: Dictionary with the following keys:
             'data' (str or None): Absolute path to the first JSON file
                 containing 'data' in its name, or None if not found.
-            'database' (str or None): Absolute path to the first JSON file
+            'database' (str or None): Absolute path to the partitions directory, or to the first JSON file
                 containing 'database' in its name, or None if not found.
 
     Notes:
         The search is non-recursive; only files directly inside `_dir`
-        are considered. Matching is not case-sensitive.
+        are considered. Matching is not case-sensitive. Files are scanned
+        in alphabetical order, so the result does not depend on the file system.
     """
     fpath = {'data': None, 'database':None}
+    filenames = sorted(os.listdir(_dir))
 
     for key in fpath:
-        for filename in os.listdir(_dir):
+        for filename in filenames:
             if filename.endswith('.json') and key in filename.lower():
                 fpath[key] = os.path.join(_dir, filename)
                 break
+
+    for filename in filenames:
+        path = os.path.join(_dir, filename)
+        if 'database' in filename.lower() and not filename.endswith('.bak') and is_partitioned(path):
+            if fpath['database'] is not None:
+                logger.warning(f"Partitioned database {path!r} used, JSON database {fpath['database']!r} ignored.")
+            fpath['database'] = path
+            break
     return fpath
 
 
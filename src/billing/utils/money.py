@@ -0,0 +1,65 @@
+# money.py
+
+from decimal import Decimal, ROUND_HALF_UP
+
+__all__ = ["Cents", "to_cents", "percent_of", "multiply"]
+
+
+class Cents(int):
+    """
+    Exact amount of money, as an integer number of cents.
+    Formatted as euros: str(Cents(994250)) → "9942.50", format specs (e.g. ".2f") apply to the exact euro value.
+    Adding or subtracting integers (cents) returns Cents.
+    """
+
+    def __add__(self, other):
+        if isinstance(other, int):
+            return Cents(int(self) + int(other))
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, int):
+            return Cents(int(self) - int(other))
+        return NotImplemented
+
+    def __rsub__(self, other):
+        if isinstance(other, int):
+            return Cents(int(other) - int(self))
+        return NotImplemented
+
+    @property
+    def euros(self):
+        return Decimal(int(self)).scaleb(-2)
+
+    def __str__(self):
+        return f"{self.euros:.2f}"
+
+    def __format__(self, spec):
+        return format(self.euros, spec) if spec else str(self)
+
+    def __repr__(self):
+        return f"Cents({int(self)})"
+
+
+def _round(value):
+    """ Round a Decimal to the nearest cent, half up """
+    return Cents(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_cents(amount):
+    """ Convert an amount in euros (int, float, str or Decimal) to Cents. Cents are returned unchanged """
+    if isinstance(amount, Cents):
+        return amount
+    return _round(Decimal(str(amount)) * 100)
+
+
+def multiply(quantity, cents):
+    """ Exact quantity (e.g. 20.5 days) times a unit price in cents, rounded to the cent """
+    return _round(Decimal(str(quantity)) * int(cents))
+
+
+def percent_of(cents, percent):
+    """ percent % of an amount in cents, rounded to the cent """
+    return _round(Decimal(int(cents)) * percent / 100)
@@ -1,9 +1,15 @@
 # paths
 import os
 from os.path import dirname as up
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from functools import wraps
 from .setup_logger import logger
 
+# configuration of the running context (thread, task), falls back to DataDir class attributes when unset
+_current_config = ContextVar("billing_config", default=None)
+
 def check_existing_path(func):
     @wraps(func)
     def inner(cls, file_path):
@@ -12,6 +18,15 @@ def check_existing_path(func):
         return func(cls, file_path)
     return inner
 
+def check_existing_database(func):
+    @wraps(func)
+    def inner(cls, database_path):
+        # JSON file or directory of year partitions
+        if not os.path.exists(database_path):
+            raise FileNotFoundError(f"Database path {database_path!r} does not exist.")
+        return func(cls, database_path)
+    return inner
+
 def check_existing_dir(func):
     @wraps(func)
     def inner(cls, _dir):
@@ -22,6 +37,31 @@ def check_existing_dir(func):
     return inner
 
 
+@dataclass(frozen=True)
+class Config:
+    """ Paths of one tenant: company data file, database file and invoice directory """
+    data: str
+    database: str
+    invoice_dir: str
+
+    @classmethod
+    def create(cls, data, database, invoice_dir):
+        """ Build a configuration from user paths, with the same checks as DataDir updates """
+        if not os.path.isfile(data):
+            raise FileNotFoundError(f"Data path {data!r} does not exist.")
+        if not os.path.exists(database):
+            raise FileNotFoundError(f"Database path {database!r} does not exist.")
+        if not os.path.isdir(invoice_dir):
+            logger.warning(f"Directory {invoice_dir!r} does not exist. It is created.")
+            os.mkdir(invoice_dir)
+        return cls(os.path.abspath(data), os.path.abspath(database), os.path.abspath(invoice_dir))
+
+    def status(self):
+        return (f"* data :        {self.data!r}\n"
+                f"* database :    {self.database!r}\n"
+                f"* invoice dir : {self.invoice_dir!r}")
+
+
 class DataDir:
 
     INVOICE_DIR = os.path.abspath("./invoices")
@@ -37,7 +77,7 @@ class DataDir:
         cls.DATA = os.path.abspath(data_path)
 
     @classmethod
-    @check_existing_path
+    @check_existing_database
     def update_database_path(cls, database_path):
         cls.DATABASE = os.path.abspath(database_path)
 
@@ -46,6 +86,29 @@ class DataDir:
     def update_invoice_dir(cls, invoice_dir):
         cls.INVOICE_DIR = os.path.abspath(invoice_dir)
 
+    @classmethod
+    def current(cls):
+        """ Configuration of the running context, defaults to the DataDir paths """
+        config = _current_config.get()
+        if config is None:
+            config = Config(cls.DATA, cls.DATABASE, cls.INVOICE_DIR)
+        return config
+
+    @classmethod
+    def in_context(cls):
+        """ True if a configuration is set for the running context (explicit tenant), False for DataDir paths """
+        return _current_config.get() is not None
+
+    @classmethod
+    @contextmanager
+    def use(cls, config):
+        """ Set the configuration of the running context (thread, task) only, DataDir paths are untouched """
+        token = _current_config.set(config)
+        try:
+            yield config
+        finally:
+            _current_config.reset(token)
+
     @classmethod
     def status(cls):
         return (f"* data :        {cls.DATA!r}\n" 
@@ -0,0 +1,59 @@
+# tenants.py
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from ..invoice import Invoice
+from ..database import InvoiceDataBase
+from .paths import DataDir
+from .setup_logger import logger
+
+__all__ = ["run_tenants", "bill_tenant"]
+
+
+def _run_in_context(job, config):
+    """ run job inside the configuration context of one tenant """
+    with DataDir.use(config):
+        return job(config)
+
+
+def run_tenants(configs, job, max_workers=None, processes=False):
+    """
+    Run a billing job for several tenants (companies) in parallel.
+
+    Each job is executed with its own configuration set in the running context, so that `Invoice` and
+    `InvoiceDataBase` created inside the job use the tenant paths without touching the global `DataDir`.
+
+    Args:
+        configs (Iterable[Config]): tenant configurations.
+        job (Callable[[Config], Any]): job to run for each tenant. Must be picklable if processes is True.
+        max_workers (int): size of the pool, defaults to the executor default.
+        processes (bool): use a process pool instead of a thread pool.
+
+    Returns:
+        list: results of job, in the order of configs.
+    """
+    executor_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    configs = list(configs)
+
+    with executor_cls(max_workers=max_workers) as executor:
+        futures = [executor.submit(_run_in_context, job, config) for config in configs]
+        results = [future.result() for future in futures]
+
+    logger.info(f"{len(configs)} tenant(s) processed")
+    return results
+
+
+def bill_tenant(config, period_month, period_year, quantity, unit_price=485, TVA=False, profile="default"):
+    """
+    Check, store and build one invoice for a tenant.
+    Use with `functools.partial` to bind invoice details before calling `run_tenants`.
+
+    Returns:
+        Invoice: the stored invoice.
+    """
+    db = InvoiceDataBase(config=config)
+    invoice = Invoice(period_month=period_month, period_year=period_year, quantity=quantity,
+                      unit_price=unit_price, TVA=TVA, config=config)
+    db.check_invoice(invoice)
+    db.add_invoice(invoice)
+    invoice.build_pdf(profile=profile)
+    return invoice
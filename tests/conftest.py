@@ -0,0 +1,44 @@
+import json
+import pytest
+from billing.database.integrity import GENESIS_HASH, chain_records
+from billing.utils.paths import Config, DataDir
+
+
+@pytest.fixture
+def make_records():
+    """ Build database records, one per year given, chained from prev_hash unless hashed is False """
+    def inner(years, total_HT_cents=48500, start=1, prev_hash=GENESIS_HASH, hashed=True):
+        records = [
+            {
+                "number": number,
+                "period_month": "Mai",
+                "period_year": year,
+                "quantity": 1.0,
+                "TVA": False,
+                "invoice_date": f"10/06/{year}",
+                "unit_price_cents": total_HT_cents,
+                "total_HT_cents": total_HT_cents,
+            }
+            for number, year in enumerate(years, start=start)
+        ]
+        if hashed:
+            chain_records(records, prev_hash)
+        return records
+    return inner
+
+
+@pytest.fixture
+def db_config(tmp_path):
+    """ Configuration of a tenant with an empty JSON database """
+    database = tmp_path / "database.json"
+    database.write_text("[]")
+    return Config(data=DataDir.DUMMY_DATA, database=str(database), invoice_dir=str(tmp_path))
+
+
+@pytest.fixture
+def write_records():
+    """ Write records to a JSON database file: write_records(path, records) """
+    def inner(path, records):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+    return inner
@@ -0,0 +1,114 @@
+import glob
+import gzip
+import json
+import os
+import pytest
+from billing.database import InvoiceDataBase
+from billing.database.backup import backup, restore
+from billing.database.exceptions import IntegrityError
+from billing.database.storage import PartitionedStorage
+from billing.utils.paths import Config, DataDir
+
+
+def manifest(backup_dir):
+    with open(os.path.join(backup_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def rewrite_segment(backup_dir, filename, edit):
+    path = os.path.join(backup_dir, filename)
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        records = json.load(f)
+    edit(records)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(records, f)
+
+
+def test_backup_delta_restore_round_trip(db_config, make_records, tmp_path, write_records):
+    backup_dir = str(tmp_path / "backup")
+    records = make_records([2025] * 2)
+    write_records(db_config.database, records)
+    backup(InvoiceDataBase(db_config), backup_dir)
+
+    records += make_records([2025] * 3, start=3, prev_hash=records[-1]["hash"])
+    write_records(db_config.database, records)
+    assert backup(InvoiceDataBase(db_config), backup_dir) is not None
+    assert backup(InvoiceDataBase(db_config), backup_dir) is None
+
+    segments = manifest(backup_dir)["segments"]
+    assert [(s["kind"], s["start"], s["count"]) for s in segments] == [("full", 0, 2), ("delta", 2, 3)]
+
+    restored = str(tmp_path / "restored.json")
+    assert restore(backup_dir, restored) == 5
+    with open(restored, "r", encoding="utf-8") as f:
+        assert json.load(f) == records
+
+
+def test_diverged_database_gets_full_backup(db_config, make_records, tmp_path, write_records):
+    backup_dir = str(tmp_path / "backup")
+    write_records(db_config.database, make_records([2025] * 2))
+    backup(InvoiceDataBase(db_config), backup_dir)
+
+    write_records(db_config.database, make_records([2025] * 3, total_HT_cents=100))
+    backup(InvoiceDataBase(db_config), backup_dir)
+
+    assert [s["kind"] for s in manifest(backup_dir)["segments"]] == ["full"]
+
+
+def test_restore_keeps_every_previous_database(db_config, make_records, tmp_path, write_records):
+    backup_dir = str(tmp_path / "backup")
+    write_records(db_config.database, make_records([2025] * 2))
+    backup(InvoiceDataBase(db_config), backup_dir)
+    write_records(db_config.database, make_records([2025], total_HT_cents=1))
+
+    restore(backup_dir, db_config.database)
+    restore(backup_dir, db_config.database)
+
+    copies = sorted(glob.glob(f"{db_config.database}.*.bak"))
+    assert len(copies) == 2
+    with open(copies[0], "r", encoding="utf-8") as f:
+        assert json.load(f) == make_records([2025], total_HT_cents=1)
+    assert InvoiceDataBase(db_config).verify_integrity(full=True) == 2
+
+
+def test_restore_keeps_previous_partitions(make_records, tmp_path):
+    backup_dir = str(tmp_path / "backup")
+    path = str(tmp_path / "database")
+    storage = PartitionedStorage(path, year=2025)
+    storage.write_all(make_records([2024, 2025]))
+    config = Config(data=DataDir.DUMMY_DATA, database=path, invoice_dir=str(tmp_path))
+    backup(InvoiceDataBase(config), backup_dir)
+
+    restore(backup_dir, path)
+    restore(backup_dir, path)
+
+    copies = glob.glob(f"{path}.*.bak")
+    assert len(copies) == 2
+    assert all(os.path.isfile(os.path.join(copy, "2024.json.gz")) for copy in copies)
+
+
+def test_unreadable_segment_raises_os_error(db_config, make_records, tmp_path, write_records):
+    backup_dir = str(tmp_path / "backup")
+    write_records(db_config.database, make_records([2025]))
+    filename = backup(InvoiceDataBase(db_config), backup_dir)
+    with open(os.path.join(backup_dir, filename), "wb") as f:
+        f.write(b"not gzip")
+
+    with pytest.raises(OSError):
+        restore(backup_dir, str(tmp_path / "restored.json"))
+
+
+@pytest.mark.parametrize("edit, match", [
+    (lambda records: records[0].update(quantity=99.0), "hash chain broken"),
+    (lambda records: records[1].pop("hash"), "partially hashed"),
+])
+def test_corrupted_backup_is_refused(db_config, make_records, tmp_path, edit, match, write_records):
+    backup_dir = str(tmp_path / "backup")
+    write_records(db_config.database, make_records([2025] * 2))
+    filename = backup(InvoiceDataBase(db_config), backup_dir)
+    rewrite_segment(backup_dir, filename, edit)
+
+    restored = tmp_path / "restored.json"
+    with pytest.raises(IntegrityError, match=match):
+        restore(backup_dir, str(restored))
+    assert not restored.exists()
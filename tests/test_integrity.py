@@ -0,0 +1,109 @@
+from datetime import datetime
+import pytest
+from billing.database import InvoiceDataBase
+from billing.database.exceptions import IntegrityError
+from billing.database.integrity import chain_records, verify_chain, load_checkpoint
+from billing.invoice import Invoice
+
+YEAR = datetime.now().year
+
+
+def test_intact_chain_is_verified(db_config, make_records, write_records):
+    write_records(db_config.database, make_records([2025] * 3))
+
+    assert InvoiceDataBase(db_config).verify_integrity(full=True) == 3
+
+
+@pytest.mark.parametrize("key, value", [("quantity", 99.0), ("total_HT_cents", 1), ("TVA", True)])
+def test_tampered_record_is_detected(db_config, make_records, key, value, write_records):
+    records = make_records([2025] * 3)
+    records[1][key] = value
+    write_records(db_config.database, records)
+
+    with pytest.raises(IntegrityError, match="n°2"):
+        InvoiceDataBase(db_config).verify_integrity(full=True)
+
+
+def test_partially_hashed_ledger_is_refused(make_records):
+    records = make_records([2025] * 2)
+    del records[0]["hash"]
+
+    with pytest.raises(IntegrityError, match="partially hashed"):
+        verify_chain(records)
+    assert verify_chain(make_records([2025] * 2, hashed=False)) is False
+
+
+def test_added_invoice_is_chained(db_config, make_records, write_records):
+    write_records(db_config.database, make_records([YEAR - 1, YEAR]))
+    db = InvoiceDataBase(db_config)
+    invoice = Invoice(period_month="Mai", period_year=2025, quantity=2, config=db_config)
+
+    db.check_invoice(invoice)
+    db.add_invoice(invoice)
+
+    # revenue of the current year only
+    assert db.total_HT == InvoiceDataBase(db_config).total_HT == 48500 + 2 * 48500
+    assert InvoiceDataBase(db_config).verify_integrity(full=True) == 3
+
+
+def test_legacy_ledger_is_sealed_on_add(db_config, make_records, write_records):
+    write_records(db_config.database, make_records([2025] * 2, hashed=False))
+    db = InvoiceDataBase(db_config)
+    invoice = Invoice(period_month="Mai", period_year=2025, quantity=2, config=db_config)
+
+    db.check_invoice(invoice)
+    db.add_invoice(invoice)
+
+    assert InvoiceDataBase(db_config).verify_integrity(full=True) == 3
+
+
+def test_checkpoint_resumes_verification(db_config, make_records, write_records):
+    records = make_records([2025] * 3)
+    write_records(db_config.database, records)
+    assert InvoiceDataBase(db_config).verify_integrity() == 3
+    assert load_checkpoint(db_config.database) == (3, records[-1]["hash"])
+
+    # only invoices added since the checkpoint are hashed
+    write_records(db_config.database, records + make_records([2025] * 2, start=4, prev_hash=records[-1]["hash"]))
+    assert InvoiceDataBase(db_config).verify_integrity() == 2
+    assert InvoiceDataBase(db_config).verify_integrity() == 0
+    assert load_checkpoint(db_config.database)[0] == 5
+
+
+def test_checkpoint_detects_rewritten_history(db_config, make_records, write_records):
+    records = make_records([2025] * 3)
+    write_records(db_config.database, records)
+    InvoiceDataBase(db_config).verify_integrity()
+
+    # verified invoices removed
+    write_records(db_config.database, records[:2])
+    with pytest.raises(IntegrityError, match="removed"):
+        InvoiceDataBase(db_config).verify_integrity()
+
+    # verified ledger re-chained from a modified invoice
+    records[0]["quantity"] = 99.0
+    chain_records(records)
+    write_records(db_config.database, records)
+    with pytest.raises(IntegrityError, match="differs from last verified state"):
+        InvoiceDataBase(db_config).verify_integrity()
+
+
+
+def test_incremental_verification_only_rehashes_last_verified(db_config, make_records, write_records):
+    records = make_records([2025] * 3)
+    write_records(db_config.database, records)
+    InvoiceDataBase(db_config).verify_integrity()
+
+    # in-place edit of the last verified invoice, hash left untouched
+    records[2]["total_HT_cents"] = 999999
+    write_records(db_config.database, records)
+    with pytest.raises(IntegrityError, match="n°3 is corrupted"):
+        InvoiceDataBase(db_config).verify_integrity()
+
+    # in-place edit of an older verified invoice is only caught by a full verification
+    records[2]["total_HT_cents"] = 48500
+    records[0]["total_HT_cents"] = 999999
+    write_records(db_config.database, records)
+    assert InvoiceDataBase(db_config).verify_integrity() == 0
+    with pytest.raises(IntegrityError, match="n°1 is corrupted"):
+        InvoiceDataBase(db_config).verify_integrity(full=True)
@@ -0,0 +1,74 @@
+import re
+from datetime import datetime
+import pytest
+from billing.database import InvoiceDataBase
+from billing.database.exceptions import IntegrityError
+from billing.invoice import Invoice, InvoiceLine
+
+YEAR = datetime.now().year
+
+
+def make_invoice(config, lines, TVA=False):
+    return Invoice(period_month="Mai", period_year=YEAR, TVA=TVA, config=config, lines=lines)
+
+
+def test_multi_line_totals(db_config):
+    lines = [InvoiceLine("Mission A", 20.5, 485), InvoiceLine("Mission B", 3, 520), InvoiceLine("Frais", 1, 12.34)]
+
+    invoice = make_invoice(db_config, lines, TVA=True)
+
+    assert invoice.quantity == 24.5
+    assert invoice.total_HT == 994250 + 156000 + 1234
+    assert invoice.total_TVA == 230297
+    assert invoice.total_TTC == invoice.total_HT + 230297
+    assert invoice.unit_price is None
+    assert make_invoice(db_config, lines[:1]).unit_price == 48500
+
+
+def test_single_line_shortcut(db_config):
+    invoice = Invoice(period_month="Mai", period_year=YEAR, quantity=2, config=db_config)
+
+    assert [(line.description, line.quantity, line.unit_price) for line in invoice.lines] == \
+        [(Invoice.DESCRIPTION, 2, 48500)]
+
+
+def test_invoice_requires_lines(db_config):
+    with pytest.raises(ValueError, match="quantity"):
+        Invoice(period_month="Mai", period_year=YEAR, config=db_config)
+    with pytest.raises(ValueError, match="at least one line"):
+        make_invoice(db_config, [])
+
+
+def test_lines_are_stored_and_hashed(db_config):
+    lines = [InvoiceLine("Mission A", 2, 485), InvoiceLine("Frais", 1, 10)]
+    db = InvoiceDataBase(db_config)
+    invoice = make_invoice(db_config, lines)
+    db.check_invoice(invoice)
+    db.add_invoice(invoice)
+
+    record = next(iter(InvoiceDataBase(db_config)))
+    assert record["lines"] == [
+        {"description": "Mission A", "quantity": 2, "unit_price_cents": 48500},
+        {"description": "Frais", "quantity": 1, "unit_price_cents": 1000},
+    ]
+    assert record["total_HT_cents"] == 98000
+
+    # lines are part of the hashed record
+    record["lines"][1]["unit_price_cents"] = 1
+    db = InvoiceDataBase(db_config)
+    db.db[0] = record
+    with pytest.raises(IntegrityError, match="corrupted"):
+        db.verify_integrity(full=True)
+
+
+def test_long_table_repeats_header_on_each_page(db_config):
+    lines = [InvoiceLine(f"Jour {day}", 1, 485) for day in range(120)]
+
+    pdf = make_invoice(db_config, lines).render_pdf("uncompressed")
+
+    # page content streams are readable with the uncompressed profile
+    pages = re.findall(rb"stream\r?\n(.*?)endstream", pdf, re.S)
+    table_pages = [page for page in pages if b"(Jour " in page]
+    assert len(table_pages) > 2
+    assert all(page.count(b"(Description)") == 1 for page in table_pages)
+    assert all(f"(Jour {day})".encode() in pdf for day in range(120))
@@ -0,0 +1,54 @@
+from decimal import Decimal
+import pytest
+from billing.invoice import InvoiceLine
+from billing.utils.money import Cents, to_cents, multiply, percent_of
+
+
+@pytest.mark.parametrize("amount, cents", [
+    (485, 48500),
+    (0.1, 10),
+    (1.005, 101),
+    (2.675, 268),
+    ("0.125", 13),
+    (Decimal("-0.005"), -1),
+    (Cents(42), 42),
+])
+def test_to_cents_rounds_half_up(amount, cents):
+    assert to_cents(amount) == cents
+    assert isinstance(to_cents(amount), Cents)
+
+
+def test_multiply_is_exact():
+    assert multiply(20.5, 48500) == 994250
+    assert multiply(0.1, 3) == 0
+    assert multiply(0.5, 1) == 1
+    assert multiply(3, Cents(33333)) == 99999
+
+
+def test_percent_of_rounds_to_the_cent():
+    assert percent_of(Cents(994250), 20) == 198850
+    assert percent_of(Cents(12), 20) == 2
+    assert percent_of(Cents(13), 50) == 7
+
+
+def test_cents_arithmetic_returns_cents():
+    amount = Cents(48500)
+    for result, expected in [(amount + 1, 48501), (1 + amount, 48501), (amount + amount, 97000),
+                             (amount - 500, 48000), (50000 - amount, 1500), (sum([amount, amount]), 97000)]:
+        assert result == expected
+        assert isinstance(result, Cents)
+    assert isinstance(amount + 0.5, float)
+
+
+def test_sum_of_lines_has_no_float_drift():
+    lines = [InvoiceLine("frais", 1, 0.1) for _ in range(10)]
+    assert sum(line.total_HT for line in lines) == to_cents(1)
+
+
+def test_cents_format_as_euros():
+    amount = Cents(994250)
+    assert str(amount) == "9942.50"
+    assert f"{amount:.2f}" == "9942.50"
+    assert f"{Cents(-5):.2f}" == "-0.05"
+    assert repr(amount) == "Cents(994250)"
+    assert amount.euros == Decimal("9942.50")
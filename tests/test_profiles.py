@@ -0,0 +1,45 @@
+import json
+import pytest
+from billing.invoice import Invoice
+from billing.invoice.profiles import get_profile
+from billing.invoice.template import load_plan
+from billing.utils.paths import Config, DataDir
+
+
+def make_invoice(config):
+    return Invoice(period_month="Mai", period_year=2025, quantity=20.5, TVA=True, config=config)
+
+
+def test_reproducible_profile_gives_identical_files(db_config):
+    invoice = make_invoice(db_config)
+
+    assert invoice.render_pdf("reproducible") == make_invoice(db_config).render_pdf("reproducible")
+    assert invoice.render_pdf("default").startswith(b"%PDF")
+
+
+def test_default_template_only_uses_standard_fonts():
+    assert load_plan().font_names == {"Helvetica", "Helvetica-Bold"}
+    get_profile("reproducible").check_fonts(load_plan().font_names)
+
+
+def test_non_standard_font_is_refused_before_rendering(tmp_path):
+    with open(DataDir.DUMMY_DATA, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    with open(load_plan().name, "r", encoding="utf-8") as f:
+        template = json.load(f)
+    template["footer"]["font"] = "DejaVuSans"
+    (tmp_path / "layout.json").write_text(json.dumps(template))
+    data["template"] = "layout.json"
+    (tmp_path / "data.json").write_text(json.dumps(data))
+    config = Config(data=str(tmp_path / "data.json"), database=DataDir.DUMMY_DATABASE, invoice_dir=str(tmp_path))
+
+    invoice = make_invoice(config)
+
+    with pytest.raises(ValueError, match="DejaVuSans"):
+        invoice.render_pdf("reproducible")
+    assert invoice._elements == []
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError, match="compact"):
+        get_profile("compact")
@@ -0,0 +1,207 @@
+import glob
+import json
+import os
+import stat
+from datetime import datetime
+import pytest
+from billing.database import InvoiceDataBase
+from billing.database.exceptions import IntegrityError
+from billing.database.integrity import chain_records
+from billing.database.backup import backup
+from billing.database.storage import PartitionedStorage, is_partitioned, migrate_amounts, migrate_to_partitions
+from billing.invoice import Invoice
+from billing.utils.money import Cents
+from billing.utils.paths import Config, DataDir
+
+YEAR = datetime.now().year
+
+
+def float_records(years, total_HT=485.0):
+    """ records stored before integer cents """
+    records = [
+        {"number": number, "period_month": "Mai", "period_year": year, "quantity": 1.0, "unit_price": total_HT,
+         "total_HT": total_HT, "TVA": False, "invoice_date": f"10/06/{year}"}
+        for number, year in enumerate(years, start=1)
+    ]
+    chain_records(records)
+    return records
+
+
+def test_year_rollover_freezes_previous_year(tmp_path, make_records):
+    path = str(tmp_path / "database")
+    records = make_records([2024] * 2)
+    PartitionedStorage(path, year=2024).save(records)
+
+    storage = PartitionedStorage(path, year=2025)
+
+    assert not os.path.exists(os.path.join(path, "2024.json"))
+    archive = os.path.join(path, "2024.json.gz")
+    assert not os.stat(archive).st_mode & stat.S_IWUSR
+    assert storage.manifest["active"] == 2025
+    assert storage.manifest["frozen"] == [{"year": 2024, "count": 2, "last_number": 2,
+                                           "last_hash": records[-1]["hash"], "total_HT_cents": 97000}]
+    assert storage.load() == []
+    assert storage.offset == 2
+    assert storage.prev_hash == records[-1]["hash"]
+    assert list(storage.archived(1)) == records[1:]
+    assert list(storage.year(2024)) == records
+
+
+def test_partitioned_database_only_loads_active_year(tmp_path, make_records):
+    path = str(tmp_path / "database")
+    records = make_records([YEAR - 2, YEAR - 1, YEAR - 1, YEAR], total_HT_cents=100)
+    PartitionedStorage(path).write_all(records)
+
+    db = InvoiceDataBase(Config(data=DataDir.DUMMY_DATA, database=path, invoice_dir=str(tmp_path)))
+
+    assert len(db) == 1 and db.count == 4
+    assert db.total_HT == Cents(100)
+    assert db.revenue_by_year() == {YEAR - 2: 100, YEAR - 1: 200, YEAR: 100}
+    assert list(db.history(YEAR - 1)) == records[1:3]
+    assert db.verify_integrity(full=True) == 4
+
+
+def test_threshold_revenue_does_not_depend_on_layout(db_config, make_records, write_records, tmp_path):
+    write_records(db_config.database, make_records([YEAR - 1, YEAR - 1, YEAR], total_HT_cents=100))
+    migrate_to_partitions(db_config.database, str(tmp_path / "database"))
+    partitioned = Config(data=DataDir.DUMMY_DATA, database=str(tmp_path / "database"), invoice_dir=str(tmp_path))
+
+    assert InvoiceDataBase(db_config).total_HT == InvoiceDataBase(partitioned).total_HT == Cents(100)
+    assert InvoiceDataBase(db_config).revenue_by_year() == InvoiceDataBase(partitioned).revenue_by_year()
+
+
+def test_future_invoices_are_refused(tmp_path, make_records):
+    with pytest.raises(ValueError):
+        PartitionedStorage(str(tmp_path / "database"), year=2024).write_all(make_records([2025]))
+
+
+def test_float_database_must_be_migrated(db_config, write_records):
+    write_records(db_config.database, float_records([YEAR] * 2, total_HT=100.005))
+
+    with pytest.raises(IntegrityError, match="--migrate-amounts"):
+        InvoiceDataBase(db_config)
+
+    assert migrate_amounts(db_config.database) == 2
+    db = InvoiceDataBase(db_config)
+    assert db.total_HT == Cents(20002)
+    assert db.verify_integrity(full=True) == 2
+
+
+def test_tampered_float_database_is_not_migrated(db_config, tmp_path, write_records):
+    records = float_records([2024, 2025])
+    records[0]["total_HT"] = 99999.0
+    write_records(db_config.database, records)
+
+    with pytest.raises(IntegrityError, match="n°1"):
+        migrate_amounts(db_config.database)
+    with pytest.raises(IntegrityError, match="n°1"):
+        migrate_to_partitions(db_config.database, str(tmp_path / "database"))
+
+    with open(db_config.database, "r", encoding="utf-8") as f:
+        assert json.load(f) == records
+
+
+def test_migrate_to_partitions(db_config, tmp_path, write_records):
+    write_records(db_config.database, float_records([YEAR - 1, YEAR]))
+    path = str(tmp_path / "database")
+
+    storage = migrate_to_partitions(db_config.database, path)
+
+    assert [partition["year"] for partition in storage.manifest["frozen"]] == [YEAR - 1]
+    db = InvoiceDataBase(Config(data=DataDir.DUMMY_DATA, database=path, invoice_dir=str(tmp_path)))
+    assert db.revenue_by_year() == {YEAR - 1: 48500, YEAR: 48500}
+    assert db.verify_integrity(full=True) == 2
+    with pytest.raises(FileExistsError):
+        migrate_to_partitions(db_config.database, path)
+
+
+def test_backup_directory_is_not_a_partitioned_database(db_config, make_records, write_records, tmp_path):
+    write_records(db_config.database, make_records([YEAR]))
+    backup_dir = str(tmp_path / "database_backup")
+    backup(InvoiceDataBase(db_config), backup_dir)
+    PartitionedStorage(str(tmp_path / "database"))
+
+    assert not is_partitioned(backup_dir)
+    assert not is_partitioned(db_config.database)
+    assert is_partitioned(str(tmp_path / "database"))
+    with pytest.raises(ValueError, match="not a partitioned database"):
+        PartitionedStorage(backup_dir)
+
+
+@pytest.mark.parametrize("step", ["remove", "manifest"])
+def test_interrupted_freeze_is_replayed(tmp_path, make_records, monkeypatch, step):
+    path = str(tmp_path / "database")
+    records = make_records([2024] * 2)
+    PartitionedStorage(path, year=2024).save(records)
+
+    def crash(*args):
+        raise OSError("crash")
+    with monkeypatch.context() as m:
+        m.setattr(os, "remove", crash) if step == "remove" else m.setattr(PartitionedStorage, "_save_manifest", crash)
+        with pytest.raises(OSError):
+            PartitionedStorage(path, year=2025)
+
+    storage = PartitionedStorage(path, year=2025)
+    assert [partition["year"] for partition in storage.manifest["frozen"]] == [2024]
+    assert storage.offset == 2
+    assert not os.path.exists(os.path.join(path, "2024.json"))
+    assert list(storage.archived()) == records
+
+
+def test_interrupted_rewrite_keeps_previous_archives(tmp_path, make_records, monkeypatch):
+    path = str(tmp_path / "database")
+    storage = PartitionedStorage(path, year=2025)
+    records = make_records([2023, 2024, 2025])
+    storage.write_all(records)
+
+    write_archive = PartitionedStorage._write_archive
+    def crash_on_2024(self, year, records):
+        if year == 2024:
+            raise OSError("crash")
+        return write_archive(self, year, records)
+    monkeypatch.setattr(PartitionedStorage, "_write_archive", crash_on_2024)
+    with pytest.raises(OSError):
+        storage.write_all(make_records([2023, 2024, 2025], total_HT_cents=100))
+    monkeypatch.undo()
+
+    storage = PartitionedStorage(path, year=2025)
+    assert list(storage.archived()) + storage.load() == records
+
+    storage.write_all(records[1:])
+    assert [partition["year"] for partition in storage.manifest["frozen"]] == [2024]
+    assert not os.path.exists(os.path.join(path, "2023.json.gz"))
+
+
+def test_amounts_migration_keeps_a_copy(db_config, write_records):
+    records = float_records([YEAR])
+    write_records(db_config.database, records)
+
+    migrate_amounts(db_config.database)
+
+    copies = glob.glob(f"{db_config.database}.*.bak")
+    assert len(copies) == 1
+    with open(copies[0], "r", encoding="utf-8") as f:
+        assert json.load(f) == records
+
+
+def test_invoice_without_amount_is_not_migrated(db_config, write_records):
+    records = float_records([YEAR])
+    del records[0]["total_HT"]
+    chain_records(records)
+    write_records(db_config.database, records)
+
+    with pytest.raises(ValueError, match="n°1 has no amount"):
+        migrate_amounts(db_config.database)
+
+
+def test_revenue_rollup_follows_added_invoices(db_config, make_records, write_records):
+    write_records(db_config.database, make_records([YEAR - 2, YEAR - 1, YEAR - 1], total_HT_cents=100))
+    db = InvoiceDataBase(db_config)
+    invoice = Invoice(period_month="Mai", period_year=YEAR, quantity=1, unit_price=1, config=db_config)
+
+    db.check_invoice(invoice)
+    db.add_invoice(invoice)
+
+    assert db.revenue_by_year() == {YEAR - 2: 100, YEAR - 1: 200, YEAR: 100}
+    assert db.total_HT == Cents(100)
+    assert db.revenue_by_year() == InvoiceDataBase(db_config).revenue_by_year()
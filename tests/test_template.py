@@ -0,0 +1,113 @@
+import json
+import pytest
+from reportlab.platypus import LongTable, Paragraph, Spacer
+from billing.invoice import Invoice, InvoiceLine
+from billing.invoice.template import compile_template, load_plan
+from billing.utils.paths import Config, DataDir
+
+TEMPLATE = {
+    "styles": {"title": {"fontSize": 20, "alignment": "center"}},
+    "sections": [
+        {"name": "header", "items": [
+            {"type": "paragraph", "text": "FACTURE", "style": "title"},
+            {"type": "spacer", "height": 10},
+            {"type": "paragraph", "text": "n°{number} - {company.name}"},
+            {"type": "paragraph", "text": "TVA {total_TVA:.2f}", "if": "TVA"},
+            {"type": "paragraph", "text": "TVA non applicable", "unless": "TVA"},
+        ]},
+        {"name": "lines", "items": [
+            {"type": "table", "header": ["Description", "Total"], "line_row": ["{description}", "{total_HT:.2f}"],
+             "rows": [["Total", "{total_HT:.2f}"]]},
+        ]},
+    ],
+    "footer": {"font": "Times-Roman", "items": [{"text": "{company.name}"}, {"text": "TVA", "if": "TVA"}]},
+}
+
+
+def make_invoice(config, TVA=False):
+    lines = [InvoiceLine("Mission", 2, 485), InvoiceLine("Frais", 1, 10.5)]
+    return Invoice(period_month="Mai", period_year=2025, TVA=TVA, config=config, lines=lines)
+
+
+def texts(flowables):
+    return [flowable.getPlainText() for flowable in flowables if isinstance(flowable, Paragraph)]
+
+
+def test_compile_template(db_config):
+    plan = compile_template(TEMPLATE, name="test")
+    invoice = make_invoice(db_config)
+
+    flowables = plan.flowables(invoice)
+
+    assert [type(flowable) for flowable in flowables] == [Paragraph, Spacer, Paragraph, Paragraph, LongTable]
+    assert texts(flowables)[:2] == ["FACTURE", f"n°{invoice.number} - {invoice.company.name}"]
+    table = flowables[-1]
+    assert table._cellvalues == [["Description", "Total"], ["Total", "980.50"], ["Mission", "970.00"],
+                                 ["Frais", "10.50"]]
+    assert plan.font_names == {"Helvetica", "Times-Roman"}
+
+
+@pytest.mark.parametrize("TVA, expected", [(True, "TVA 196.10"), (False, "TVA non applicable")])
+def test_if_unless_conditions(db_config, TVA, expected):
+    plan = compile_template(TEMPLATE)
+    invoice = make_invoice(db_config, TVA=TVA)
+
+    assert texts(plan.flowables(invoice))[2:] == [expected]
+
+
+def test_footer_conditions(db_config):
+    plan = compile_template(TEMPLATE)
+    drawn = []
+
+    class Canvas:
+        def saveState(self): pass
+        def restoreState(self): pass
+        def setFont(self, font, size): drawn.append(font)
+        def drawString(self, x, y, text): drawn.append(text)
+
+    for TVA in (True, False):
+        invoice = make_invoice(db_config, TVA=TVA)
+        plan.footer(invoice)(Canvas(), None)
+    name = make_invoice(db_config).company.name
+    assert drawn == ["Times-Roman", f"{name}  -  TVA", "Times-Roman", name]
+
+
+def test_custom_template_from_data_file(tmp_path):
+    with open(DataDir.DUMMY_DATA, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data["template"] = "layout.json"
+    (tmp_path / "data.json").write_text(json.dumps(data))
+    (tmp_path / "layout.json").write_text(json.dumps(TEMPLATE))
+    config = Config(str(tmp_path / "data.json"), DataDir.DUMMY_DATABASE, str(tmp_path))
+
+    invoice = make_invoice(config)
+
+    assert invoice.plan is load_plan("layout.json", base_dir=str(tmp_path))
+    assert texts(invoice.plan.flowables(invoice))[0] == "FACTURE"
+    assert invoice.render_pdf("uncompressed").count(b"(FACTURE)") == 1
+
+
+def test_default_plan_is_compiled_once():
+    assert load_plan() is load_plan("default")
+
+
+@pytest.mark.parametrize("edit", [
+    lambda template: template.pop("sections"),
+    lambda template: template["sections"][0]["items"].append({"type": "image"}),
+    lambda template: template["sections"][0]["items"].append({"type": "paragraph", "text": "x", "style": "nope"}),
+])
+def test_invalid_template_raises_value_error(edit):
+    template = json.loads(json.dumps(TEMPLATE))
+    edit(template)
+
+    with pytest.raises(ValueError, match="Invalid template"):
+        compile_template(template)
+
+
+def test_invalid_template_file(tmp_path):
+    (tmp_path / "broken.json").write_text("{not json")
+
+    with pytest.raises(ValueError, match="Invalid JSON"):
+        load_plan("broken.json", base_dir=str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        load_plan("missing")
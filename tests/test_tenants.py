@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+from functools import partial
+import pytest
+from billing.database import InvoiceDataBase
+from billing.invoice import Invoice
+from billing.utils.paths import Config, DataDir
+from billing.utils.tenants import run_tenants, bill_tenant
+
+
+@pytest.fixture
+def tenants(tmp_path):
+    """ Two tenants with their own company data, empty database and invoice directory """
+    with open(DataDir.DUMMY_DATA, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    configs = []
+    for name in ("Alpha", "Beta"):
+        directory = tmp_path / name
+        directory.mkdir()
+        data["company"]["name"] = name
+        (directory / "data.json").write_text(json.dumps(data))
+        (directory / "database.json").write_text("[]")
+        configs.append(Config(str(directory / "data.json"), str(directory / "database.json"), str(directory)))
+    return configs
+
+
+def test_context_config_is_local_to_each_thread(tenants):
+    barrier = threading.Barrier(len(tenants))
+    seen = {}
+
+    def job(config):
+        with DataDir.use(config):
+            barrier.wait()
+            seen[config.data] = DataDir.current()
+        assert not DataDir.in_context()
+
+    threads = [threading.Thread(target=job, args=(config,)) for config in tenants]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == {config.data: config for config in tenants}
+    assert DataDir.current() == Config(DataDir.DATA, DataDir.DATABASE, DataDir.INVOICE_DIR)
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_run_tenants_bills_each_tenant(tenants, processes):
+    job = partial(bill_tenant, period_month="Mai", period_year=2025, quantity=2)
+
+    invoices = run_tenants(tenants, job, max_workers=2, processes=processes)
+
+    for config, invoice in zip(tenants, invoices):
+        name = os.path.basename(config.invoice_dir)
+        assert invoice.company.name == name
+        assert os.path.isfile(os.path.join(config.invoice_dir, f"facture_{invoice.number}_{name[:3]}.pdf"))
+        assert [record["number"] for record in InvoiceDataBase(config)] == [invoice.number]
+
+
+def test_explicit_config_does_not_fall_back_to_dummy_files(tenants, tmp_path):
+    missing = Config(tenants[0].data, str(tmp_path / "missing.json"), tenants[0].invoice_dir)
+    with pytest.raises(FileNotFoundError, match="missing.json"):
+        InvoiceDataBase(missing)
+    with DataDir.use(missing), pytest.raises(FileNotFoundError, match="missing.json"):
+        InvoiceDataBase()
+
+    missing = Config(str(tmp_path / "missing.json"), tenants[0].database, tenants[0].invoice_dir)
+    with pytest.raises(FileNotFoundError, match="missing.json"):
+        Invoice(period_month="Mai", period_year=2025, quantity=2, config=missing)
+    with DataDir.use(missing), pytest.raises(FileNotFoundError, match="missing.json"):
+        Invoice(period_month="Mai", period_year=2025, quantity=2)